@@ -1,9 +1,11 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 import os
 import uuid
+import asyncio
+from contextlib import asynccontextmanager
 from typing import Optional
 import sys
 sys.path.append('/home/runner/work/termscon/termscon')
@@ -18,7 +20,33 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Terms & Conditions Analyzer", version="1.0.0")
+# Initialize components
+chroma_db_path = "/home/runner/work/termscon/termscon/chroma.sqlite3"
+criminal_db_path = "/home/runner/work/termscon/termscon/trestni_zakonik.sqlite"
+
+# Created at server startup rather than import, so importing the module stays cheap
+vector_db = None
+text_processor = None
+gpt_analyzer = None
+
+# Task creating the components, endpoints that need them await it first
+components_ready = None
+
+def init_components():
+    """Create the vector database, the embedding model and the GPT client."""
+    global vector_db, text_processor, gpt_analyzer
+    vector_db = VectorDatabase(chroma_db_path, criminal_db_path)
+    text_processor = TextProcessor()
+    gpt_analyzer = GPTAnalyzer()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global components_ready
+    # Loading the model and the indexes runs in the background, health checks are answered meanwhile
+    components_ready = asyncio.create_task(asyncio.to_thread(init_components))
+    yield
+
+app = FastAPI(title="Terms & Conditions Analyzer", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -29,14 +57,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-chroma_db_path = "/home/runner/work/termscon/termscon/chroma.sqlite3"
-criminal_db_path = "/home/runner/work/termscon/termscon/trestni_zakonik.sqlite"
-
-vector_db = VectorDatabase(chroma_db_path, criminal_db_path)
-text_processor = TextProcessor()
-gpt_analyzer = GPTAnalyzer()
-
 # Serve static files for frontend
 if os.path.exists("/home/runner/work/termscon/termscon/frontend/build"):
     app.mount("/static", StaticFiles(directory="/home/runner/work/termscon/termscon/frontend/build/static"), name="static")
@@ -49,6 +69,90 @@ async def root():
         return FileResponse(frontend_path)
     return {"message": "Terms & Conditions Analyzer API", "version": "1.0.0"}
 
+# Largest accepted upload in bytes
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 20 * 1024 * 1024))
+
+async def read_document_text(file: Optional[UploadFile], text_content: Optional[str]) -> str:
+    """Extract the document text from a file upload or pasted text."""
+    if file:
+        if not file.filename:
+            raise HTTPException(status_code=400, detail="No filename provided")
+        
+        # Starlette spools uploads to a temporary file, parse it from there instead of reading it into memory
+        size = await asyncio.to_thread(file.file.seek, 0, os.SEEK_END)
+        if size > MAX_UPLOAD_SIZE:
+            raise HTTPException(status_code=413, detail="File is too large")
+        
+        await file.seek(0)
+        document_text = await asyncio.to_thread(extract_text_from_file, file.file, file.filename)
+    elif text_content:
+        document_text = text_content
+    else:
+        raise HTTPException(status_code=400, detail="Either file or text_content must be provided")
+    
+    if not document_text.strip():
+        raise HTTPException(status_code=400, detail="No text content found in the document")
+    
+    return document_text
+
+def prepare_clauses(document_text: str):
+    """Segment the document and retrieve legal context for every clause."""
+    # Segment the document into clauses
+    clauses = text_processor.segment_terms_conditions(document_text)
+    
+    if not clauses:
+        raise HTTPException(status_code=400, detail="Could not segment document into clauses")
+    
+    # Embed all clauses in one batch and retrieve their legal context together
+    clause_embeddings = text_processor.get_text_embeddings_batch(clauses)
+    
+    if len(clause_embeddings) == 0:
+        raise HTTPException(status_code=500, detail="Could not analyze any clauses")
+    
+    legal_contexts = vector_db.get_legal_context_batch(clause_embeddings)
+    return clauses, legal_contexts
+
+def build_analysis_result(document_id: str, clause_analyses) -> AnalysisResult:
+    """Compute the overall summary and assemble the final analysis result."""
+    if not clause_analyses:
+        raise HTTPException(status_code=500, detail="Could not analyze any clauses")
+    
+    # Calculate overall summary in a single pass over the analyses
+    risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
+    high_risk_clauses = []
+    for analysis in clause_analyses:
+        risk_counts[analysis.risk_level.value] += 1
+        if analysis.risk_level in (RiskLevel.HIGH, RiskLevel.CRITICAL):
+            high_risk_clauses.append(analysis)
+    
+    # Determine overall risk level
+    if risk_counts["Critical"] > 0:
+        overall_risk = RiskLevel.CRITICAL
+    elif risk_counts["High"] > 0:
+        overall_risk = RiskLevel.HIGH
+    elif risk_counts["Medium"] > risk_counts["Low"]:
+        overall_risk = RiskLevel.MEDIUM
+    else:
+        overall_risk = RiskLevel.LOW
+    
+    # Generate overall summary text
+    overview_text = gpt_analyzer.generate_overall_summary(clause_analyses, risk_counts, high_risk_clauses)
+    
+    overall_summary = OverallSummary(
+        overall_risk_score=overall_risk,
+        total_clauses=len(clause_analyses),
+        high_risk_count=risk_counts["High"] + risk_counts["Critical"],
+        medium_risk_count=risk_counts["Medium"],
+        low_risk_count=risk_counts["Low"],
+        overview=overview_text
+    )
+    
+    return AnalysisResult(
+        document_id=document_id,
+        overall_summary=overall_summary,
+        clause_analyses=clause_analyses
+    )
+
 @app.post("/api/analyze", response_model=AnalysisResult)
 async def analyze_document(
     file: Optional[UploadFile] = File(None),
@@ -57,88 +161,76 @@ async def analyze_document(
     """Analyze T&C document from file upload or text input."""
     
     try:
-        # Extract text content
-        if file:
-            if not file.filename:
-                raise HTTPException(status_code=400, detail="No filename provided")
-            
-            content = await file.read()
-            document_text = extract_text_from_file(content, file.filename)
-            filename = file.filename
-        elif text_content:
-            document_text = text_content
-            filename = "pasted_text.txt"
-        else:
-            raise HTTPException(status_code=400, detail="Either file or text_content must be provided")
-        
-        if not document_text.strip():
-            raise HTTPException(status_code=400, detail="No text content found in the document")
+        await components_ready
+        document_text = await read_document_text(file, text_content)
         
         # Generate document ID
-        document_id = str(uuid.uuid4())
+        document_id = uuid.uuid4().hex
         
-        # Segment the document into clauses
-        clauses = text_processor.segment_terms_conditions(document_text)
+        # Segmentation and retrieval are CPU bound, keep them off the event loop
+        clauses, legal_contexts = await asyncio.to_thread(prepare_clauses, document_text)
         
-        if not clauses:
-            raise HTTPException(status_code=400, detail="Could not segment document into clauses")
+        # Analyze all clauses concurrently with GPT
+        clause_analyses = await asyncio.gather(*[
+            gpt_analyzer.analyze_clause_async(clause, legal_context, i + 1)
+            for i, (clause, legal_context) in enumerate(zip(clauses, legal_contexts))
+        ])
         
-        # Analyze each clause
-        clause_analyses = []
+        return await asyncio.to_thread(build_analysis_result, document_id, clause_analyses)
         
-        for i, clause in enumerate(clauses):
-            # Get embedding for the clause
-            clause_embedding = text_processor.get_text_embedding(clause)
-            
-            if not clause_embedding:
-                continue
-            
-            # Get legal context
-            legal_context = vector_db.get_legal_context(clause_embedding)
-            
-            # Analyze with GPT
-            analysis = gpt_analyzer.analyze_clause(clause, legal_context, i + 1)
-            clause_analyses.append(analysis)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@app.post("/api/analyze/batch")
+async def submit_batch_analysis(
+    file: Optional[UploadFile] = File(None),
+    text_content: Optional[str] = Form(None)
+):
+    """Submit a T&C document for offline analysis through the OpenAI Batch API."""
+    
+    try:
+        await components_ready
+        document_text = await read_document_text(file, text_content)
+        clauses, legal_contexts = await asyncio.to_thread(prepare_clauses, document_text)
         
-        if not clause_analyses:
-            raise HTTPException(status_code=500, detail="Could not analyze any clauses")
+        job_id = await asyncio.to_thread(gpt_analyzer.analyze_clauses_batch, clauses, legal_contexts)
         
-        # Calculate overall summary
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for analysis in clause_analyses:
-            risk_counts[analysis.risk_level.value] += 1
+        return {"job_id": job_id, "status": "submitted", "total_clauses": len(clauses)}
         
-        # Determine overall risk level
-        if risk_counts["Critical"] > 0:
-            overall_risk = RiskLevel.CRITICAL
-        elif risk_counts["High"] > 0:
-            overall_risk = RiskLevel.HIGH
-        elif risk_counts["Medium"] > risk_counts["Low"]:
-            overall_risk = RiskLevel.MEDIUM
-        else:
-            overall_risk = RiskLevel.LOW
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Batch submission error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch submission failed: {str(e)}")
+
+@app.get("/api/analyze/batch/{job_id}")
+async def get_batch_analysis(job_id: str):
+    """Poll a Batch API job and return the analysis result once it has completed."""
+    
+    try:
+        await components_ready
+        
+        # Submitted clauses are kept by the analyzer, batches outlive a restart of the server
+        clauses = await asyncio.to_thread(gpt_analyzer.get_batch_clauses, job_id)
+        if clauses is None:
+            raise HTTPException(status_code=404, detail="Batch job not found")
         
-        # Generate overall summary text
-        overview_text = gpt_analyzer.generate_overall_summary(clause_analyses)
+        status, clause_analyses = await asyncio.to_thread(gpt_analyzer.get_batch_results, job_id, clauses)
         
-        overall_summary = OverallSummary(
-            overall_risk_score=overall_risk,
-            total_clauses=len(clause_analyses),
-            high_risk_count=risk_counts["High"] + risk_counts["Critical"],
-            medium_risk_count=risk_counts["Medium"],
-            low_risk_count=risk_counts["Low"],
-            overview=overview_text
-        )
+        if clause_analyses is None:
+            return {"job_id": job_id, "status": status}
         
-        return AnalysisResult(
-            document_id=document_id,
-            overall_summary=overall_summary,
-            clause_analyses=clause_analyses
-        )
+        result = await asyncio.to_thread(build_analysis_result, job_id, clause_analyses)
+        return {"job_id": job_id, "status": status, "result": result}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Analysis error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        print(f"Batch polling error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch polling failed: {str(e)}")
 
 @app.get("/api/health")
 async def health_check():
@@ -2,8 +2,48 @@ import sqlite3
 import chromadb
 import numpy as np
 from typing import List, Dict, Any
-import pickle
+import json
 import os
+import threading
+
+# SimSIMD provides AVX2/AVX-512/NEON similarity kernels, fallback to NumPy if not installed
+try:
+    import simsimd as simd
+    USE_SIMSIMD = True
+except ImportError:
+    USE_SIMSIMD = False
+
+# Numba JIT kernel for Criminal Code similarities when SimSIMD is not installed
+try:
+    from numba import njit, prange
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
+
+if USE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_similarities(matrix, queries):
+        """Dot products of normalized queries against every row of the matrix, shape (M, N)."""
+        out = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+        for i in prange(matrix.shape[0]):
+            for q in range(queries.shape[0]):
+                acc = np.float32(0.0)
+                for j in range(matrix.shape[1]):
+                    acc += matrix[i, j] * queries[q, j]
+                out[q, i] = acc
+        return out
+    
+    # Compile for the read-only memmap signature at import, not on the first request
+    _warmup = np.zeros((1, 1), dtype=np.float32)
+    _warmup.flags.writeable = False
+    _dot_similarities(_warmup, np.zeros((1, 1), dtype=np.float32))
+
+# FAISS HNSW index for Civil Code search, fallback to ChromaDB queries if not installed
+try:
+    import faiss
+    USE_FAISS = True
+except ImportError:
+    USE_FAISS = False
 
 class VectorDatabase:
     def __init__(self, chroma_db_path: str, criminal_db_path: str):
@@ -13,87 +53,280 @@ class VectorDatabase:
         # Initialize ChromaDB client
         self.chroma_client = chromadb.PersistentClient(path=os.path.dirname(chroma_db_path))
         
+        # Open the Civil Code collection once instead of on every query
+        try:
+            self._civil = self.chroma_client.get_collection("civil_code")
+        except Exception as e:
+            print(f"Error opening civil code collection: {e}")
+            self._civil = None
+        
+        # HNSW index over the Civil Code embeddings, Chroma keeps documents and metadata
+        self._civil_index, self._civil_ids = None, None
+        if USE_FAISS and self._civil is not None:
+            self._civil_index, self._civil_ids = self._load_civil_index()
+        
+        # One connection for the lifetime of the database, shared by request threads
+        self._conn = sqlite3.connect(criminal_db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA query_only=ON')
+        self._conn.execute('PRAGMA mmap_size=268435456')
+        self._conn.execute('PRAGMA cache_size=-65536')
+        self._lock = threading.Lock()
+        
+        # Load Criminal Code embeddings once as a stacked float32 matrix
+        self._ids, self._matrix = self._load_criminal_code_matrix()
+        
+        # int8 copy of the matrix for SimSIMD's quantized cosine kernel (4x less bandwidth)
+        self._matrix_i8 = None
+        if USE_SIMSIMD and self._matrix is not None:
+            self._matrix_i8 = self._load_quantized_matrix()
+    
+    def _load_civil_index(self):
+        """Load the FAISS HNSW index of the Civil Code, building it from ChromaDB on first use."""
+        index_path = os.path.join(os.path.dirname(self.chroma_db_path), 'civil_code_hnsw.faiss')
+        ids_path = os.path.join(os.path.dirname(self.chroma_db_path), 'civil_code_hnsw_ids.json')
+        try:
+            if os.path.exists(index_path) and os.path.exists(ids_path):
+                index = faiss.read_index(index_path)
+                with open(ids_path, encoding='utf-8') as f:
+                    ids = json.load(f)
+                if index.ntotal == len(ids) == self._civil.count():
+                    index.hnsw.efSearch = 64
+                    return index, ids
+            
+            data = self._civil.get(include=['embeddings'])
+            if len(data['ids']) == 0:
+                return None, None
+            
+            # Same (squared L2) metric as the Chroma collection so distances keep their meaning
+            embeddings = np.asarray(data['embeddings'], dtype=np.float32, order='C')
+            index = faiss.IndexHNSWFlat(embeddings.shape[1], 32)
+            index.hnsw.efConstruction = 200
+            index.add(embeddings)
+            index.hnsw.efSearch = 64
+            
+            faiss.write_index(index, index_path)
+            with open(ids_path, 'w', encoding='utf-8') as f:
+                json.dump(data['ids'], f)
+            
+            return index, data['ids']
+        except Exception as e:
+            print(f"Error loading civil code index: {e}")
+            return None, None
+    
+    def _load_criminal_code_matrix(self):
+        """Load all Criminal Code embeddings as a memory-mapped, normalized float32 matrix."""
+        base_path = os.path.splitext(self.criminal_db_path)[0]
+        matrix_path = base_path + '_embeddings.npy'
+        ids_path = base_path + '_ids.npy'
+        try:
+            # Build the .npy files once, later startups only map them
+            db_mtime = os.path.getmtime(self.criminal_db_path)
+            if not all(os.path.exists(path) and os.path.getmtime(path) >= db_mtime for path in (matrix_path, ids_path)):
+                cursor = self._conn.cursor()
+                cursor.execute("SELECT paragraf_id, embedding FROM embeddings ORDER BY paragraf_id")
+                rows = cursor.fetchall()
+                
+                if not rows:
+                    return None, None
+                
+                ids = np.array([row[0] for row in rows])
+                matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                
+                # Normalize once so similarity becomes a plain dot product
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1
+                matrix /= norms
+                
+                np.save(matrix_path, matrix)
+                np.save(ids_path, ids)
+            
+            # Read-only mapping lets the OS page cache share the matrix across worker processes
+            ids = np.load(ids_path)
+            matrix = np.load(matrix_path, mmap_mode='r')
+            return ids, matrix
+        except Exception as e:
+            print(f"Error loading criminal code embeddings: {e}")
+            return None, None
+    
+    def _load_quantized_matrix(self):
+        """Load the int8 quantized Criminal Code matrix, building the sidecar cache on first use."""
+        cache_path = os.path.splitext(self.criminal_db_path)[0] + '_i8.npz'
+        try:
+            if os.path.getmtime(cache_path) >= os.path.getmtime(self.criminal_db_path):
+                with np.load(cache_path) as cached:
+                    if cached['matrix'].shape == self._matrix.shape:
+                        return cached['matrix']
+        except (OSError, KeyError, ValueError):
+            pass
+        
+        # Per-vector scale maps the largest component to 127; cosine ignores it and rescoring uses the float32 rows,
+        # so the scales are not kept
+        max_abs = np.abs(self._matrix).max(axis=1)
+        scales = np.divide(127, max_abs, out=np.ones_like(max_abs), where=max_abs > 0)
+        matrix_i8 = np.round(self._matrix * scales[:, None]).astype(np.int8)
+        
+        try:
+            np.savez(cache_path, matrix=matrix_i8)
+        except OSError as e:
+            print(f"Error writing quantized embeddings cache: {e}")
+        
+        return matrix_i8
+    
     def search_civil_code(self, query_embedding: List[float], n_results: int = 5) -> List[Dict[str, Any]]:
         """Search the Civil Code using vector similarity."""
+        return self.search_civil_code_batch([query_embedding], n_results)[0]
+    
+    def search_civil_code_batch(self, query_embeddings: List[List[float]], n_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search the Civil Code for several query embeddings in one Chroma query."""
+        if self._civil is None:
+            return [[] for _ in query_embeddings]
+        
         try:
-            collection = self.chroma_client.get_collection("civil_code")
+            if self._civil_index is not None:
+                return self._search_civil_index(query_embeddings, n_results)
             
-            results = collection.query(
-                query_embeddings=[query_embedding],
+            results = self._civil.query(
+                query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
                 n_results=n_results
             )
             
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    result = {
-                        'text': doc,
-                        'distance': results['distances'][0][i] if results['distances'] else None,
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] else None
-                    }
-                    formatted_results.append(result)
+            batch_results = []
+            for q in range(len(query_embeddings)):
+                formatted_results = []
+                if results['documents'] and results['documents'][q]:
+                    for i, doc in enumerate(results['documents'][q]):
+                        result = {
+                            'text': doc,
+                            'distance': results['distances'][q][i] if results['distances'] else None,
+                            'metadata': results['metadatas'][q][i] if results['metadatas'] else None
+                        }
+                        formatted_results.append(result)
+                batch_results.append(formatted_results)
             
-            return formatted_results
+            return batch_results
         except Exception as e:
             print(f"Error searching civil code: {e}")
-            return []
+            return [[] for _ in query_embeddings]
+    
+    def _search_civil_index(self, query_embeddings: List[List[float]], n_results: int) -> List[List[Dict[str, Any]]]:
+        """Search the Civil Code HNSW index and resolve documents from ChromaDB."""
+        distances, indices = self._civil_index.search(np.asarray(query_embeddings, dtype=np.float32), n_results)
+        
+        # Fetch documents and metadata for all hits in one call
+        hit_ids = list({self._civil_ids[i] for i in indices.ravel() if i >= 0})
+        found = self._civil.get(ids=hit_ids, include=['documents', 'metadatas'])
+        documents = {
+            doc_id: (doc, metadata)
+            for doc_id, doc, metadata in zip(found['ids'], found['documents'], found['metadatas'])
+        }
+        
+        batch_results = []
+        for row_distances, row_indices in zip(distances, indices):
+            formatted_results = []
+            for distance, i in zip(row_distances, row_indices):
+                if i < 0 or self._civil_ids[i] not in documents:
+                    continue
+                doc, metadata = documents[self._civil_ids[i]]
+                formatted_results.append({
+                    'text': doc,
+                    'distance': float(distance),
+                    'metadata': metadata
+                })
+            batch_results.append(formatted_results)
+        
+        return batch_results
     
     def search_criminal_code(self, query_embedding: List[float], n_results: int = 5) -> List[Dict[str, Any]]:
         """Search the Criminal Code using vector similarity."""
+        return self.search_criminal_code_batch([query_embedding], n_results)[0]
+    
+    def search_criminal_code_batch(self, query_embeddings: List[List[float]], n_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search the Criminal Code for several query embeddings in one pass over the matrix."""
+        if self._matrix is None or len(query_embeddings) == 0:
+            return [[] for _ in query_embeddings]
+        
         try:
-            conn = sqlite3.connect(self.criminal_db_path)
-            cursor = conn.cursor()
-            
-            # Get all embeddings
-            cursor.execute("SELECT paragraf_id, embedding FROM embeddings")
-            embeddings_data = cursor.fetchall()
-            
-            if not embeddings_data:
-                return []
+            queries = np.array(query_embeddings, dtype=np.float32)
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            queries /= norms
             
-            # Calculate cosine similarity
-            query_vector = np.array(query_embedding)
-            similarities = []
+            # Cosine similarities of all queries against the whole matrix, shape (M, N)
+            similarities = self._criminal_similarities(queries)
             
-            for paragraf_id, embedding_blob in embeddings_data:
-                try:
-                    embedding_vector = np.frombuffer(embedding_blob, dtype=np.float32)
-                    similarity = np.dot(query_vector, embedding_vector) / (
-                        np.linalg.norm(query_vector) * np.linalg.norm(embedding_vector)
-                    )
-                    similarities.append((paragraf_id, similarity))
-                except Exception as e:
-                    continue
+            top = self._top_k(similarities, n_results)
+            if top.shape[1] == 0:
+                return [[] for _ in query_embeddings]
             
-            # Sort by similarity and get top results
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            top_results = similarities[:n_results]
+            # Exact float32 scores for the selected rows only
+            scores = np.einsum('mkd,md->mk', self._matrix[top], queries)
+            top_ids = self._ids[top]
             
-            # Get the text for top results
-            results = []
-            for paragraf_id, similarity in top_results:
-                cursor.execute("SELECT cislo, text FROM paragrafy WHERE id = ?", (paragraf_id,))
-                row = cursor.fetchone()
-                if row:
-                    results.append({
-                        'paragraph_number': row[0],
-                        'text': row[1],
-                        'similarity': similarity
-                    })
+            # Get the text for all top results in a single query
+            unique_ids = sorted({int(paragraf_id) for paragraf_id in top_ids.ravel()})
+            placeholders = ','.join('?' * len(unique_ids))
+            with self._lock:
+                cursor = self._conn.cursor()
+                cursor.execute(f"SELECT id, cislo, text FROM paragrafy WHERE id IN ({placeholders})", unique_ids)
+                rows = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
             
-            conn.close()
-            return results
+            batch_results = []
+            for query_ids, query_scores in zip(top_ids, scores):
+                results = []
+                for paragraf_id, similarity in zip(query_ids, query_scores):
+                    row = rows.get(int(paragraf_id))
+                    if row:
+                        results.append({
+                            'paragraph_number': row[0],
+                            'text': row[1],
+                            'similarity': float(similarity)
+                        })
+                batch_results.append(results)
             
+            return batch_results
+        
         except Exception as e:
             print(f"Error searching criminal code: {e}")
-            return []
+            return [[] for _ in query_embeddings]
+    
+    @staticmethod
+    def _top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k largest similarities per row, best first, without sorting the whole row."""
+        k = max(0, min(k, similarities.shape[1]))
+        if k == 0:
+            return np.empty((similarities.shape[0], 0), dtype=np.intp)
+        
+        # O(N) selection of the largest k directly, negating would copy the whole (M, N) matrix; then sort only those k
+        top = np.argpartition(similarities, -k, axis=1)[:, -k:]
+        order = np.argsort(np.take_along_axis(similarities, top, axis=1), axis=1)[:, ::-1]
+        return np.take_along_axis(top, order, axis=1)
+    
+    def _criminal_similarities(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarities of normalized queries against the Criminal Code matrix."""
+        # Use the int8 kernel when available (cosine is scale invariant)
+        query_max = np.abs(queries).max(axis=1, keepdims=True)
+        if self._matrix_i8 is not None and (query_max > 0).all():
+            queries_i8 = np.round(queries * (127 / query_max)).astype(np.int8)
+            return 1 - np.asarray(simd.cdist(queries_i8, self._matrix_i8, metric='cosine'))
+        if USE_NUMBA:
+            return _dot_similarities(self._matrix, queries)
+        return queries @ self._matrix.T
     
     def get_legal_context(self, query_embedding: List[float], n_results: int = 3) -> Dict[str, List[Dict[str, Any]]]:
         """Get relevant legal context from both Civil and Criminal Code."""
-        civil_results = self.search_civil_code(query_embedding, n_results)
-        criminal_results = self.search_criminal_code(query_embedding, n_results)
+        return self.get_legal_context_batch([query_embedding], n_results)[0]
+    
+    def get_legal_context_batch(self, query_embeddings: List[List[float]], n_results: int = 3) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """Get legal context for several query embeddings with one search per code."""
+        # Clause embeddings arrive as float16, compute similarities in float32
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        civil_results = self.search_civil_code_batch(query_embeddings, n_results)
+        criminal_results = self.search_criminal_code_batch(query_embeddings, n_results)
         
-        return {
-            'civil_code': civil_results,
-            'criminal_code': criminal_results
-        }
\ No newline at end of file
+        return [
+            {
+                'civil_code': civil,
+                'criminal_code': criminal
+            }
+            for civil, criminal in zip(civil_results, criminal_results)
+        ]
\ No newline at end of file
@@ -8,7 +8,7 @@ class RiskLevel(Enum):
     HIGH = "High"
     CRITICAL = "Critical"
 
-@dataclass
+@dataclass(slots=True)
 class ClauseAnalysis:
     clause_id: int
     original_text: str
@@ -18,7 +18,7 @@ class ClauseAnalysis:
     explanation: str
     relevant_laws: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class OverallSummary:
     overall_risk_score: RiskLevel
     total_clauses: int
@@ -27,13 +27,13 @@ class OverallSummary:
     low_risk_count: int
     overview: str
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     document_id: str
     overall_summary: OverallSummary
     clause_analyses: List[ClauseAnalysis]
 
-@dataclass
+@dataclass(slots=True)
 class DocumentUpload:
     content: str
     filename: Optional[str] = None
\ No newline at end of file
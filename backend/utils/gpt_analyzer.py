@@ -1,16 +1,171 @@
 import os
-from openai import OpenAI
-from typing import Dict, List, Any
+import logging
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, List, Any, Optional
 from backend.models.schemas import RiskLevel, ClauseAnalysis
-import json
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of clause analyses in flight at once, to respect OpenAI rate limits
+MAX_CONCURRENT_REQUESTS = 16
+
+# Instructions shared by every clause analysis, kept as a stable prefix so OpenAI can cache it
+CLAUSE_SYSTEM_PROMPT = """Jsi právní expert specializující se na české právo a analýzu obchodních podmínek. Odpovídáš pouze v JSON formátu.
+
+Analyzuj klauzuli z obchodních podmínek vzhledem k českému právu a poskytni odpověď ve formátu JSON s následujícími položkami:
+{
+    "risk_level": "Low/Medium/High/Critical",
+    "summary": "Jednoduché shrnutí co klauzule znamená pro uživatele (max 150 slov)",
+    "legal_conflicts": ["seznam možných konfliktů s právem"],
+    "explanation": "Podrobné vysvětlení proč je klauzule problematická, včetně konkrétních odkazů na paragrafy (pokud jsou konflikty)",
+    "relevant_laws": ["§1815 Občanského zákoníku", "§XYZ Trestního zákoníku"]
+}
+
+Hodnotící kritéria pro riziko:
+- Low: Standardní klauzule bez právních problémů
+- Medium: Potenciálně problematická, ale obvykle vymahatelná
+- High: Pravděpodobně neplatná nebo nespravedlivá vůči spotřebiteli
+- Critical: Jasně v rozporu s právem nebo extrémně nespravedlivá
+
+Odpovídej pouze v JSON formátu bez dalšího textu."""
 
 class GPTAnalyzer:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY', 'demo_key'))
-        self.model = os.getenv('OPENAI_MODEL', 'gpt-4')
+        api_key = os.getenv('OPENAI_API_KEY', 'demo_key')
+        self.client = OpenAI(api_key=api_key)
+        self.aclient = AsyncOpenAI(api_key=api_key)
+        self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        # Cache of finished clause analyses, keyed by clause content hash and model
+        self._cache = sqlite3.connect(os.getenv('ANALYSIS_CACHE_DB', 'analysis_cache.sqlite3'), check_same_thread=False)
+        self._cache.execute("CREATE TABLE IF NOT EXISTS analysis_cache (hash TEXT, model TEXT, json TEXT, PRIMARY KEY (hash, model))")
+        
+        # Clauses of submitted Batch API jobs, so a restart can still collect batches already paid for
+        self._cache.execute("CREATE TABLE IF NOT EXISTS batch_jobs (batch_id TEXT PRIMARY KEY, clauses TEXT)")
+        self._cache.commit()
+        # Clauses analyzed at once read and write the cache from several worker threads, one connection serves them in turn
+        self._cache_lock = threading.Lock()
     
     def analyze_clause(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]], clause_id: int) -> ClauseAnalysis:
         """Analyze a single T&C clause against legal context using GPT-5."""
+        cached = self._get_cached_analysis(clause_text, clause_id)
+        if cached:
+            return cached
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_clause_messages(clause_text, legal_context),
+                temperature=0.3,
+                max_tokens=1000,
+                response_format={"type": "json_object"}
+            )
+            
+            return self._parse_clause_response(response.choices[0].message.content, clause_text, clause_id)
+            
+        except Exception as e:
+            logger.error("Error in GPT analysis: %s", e)
+            return self._create_fallback_analysis(clause_text, clause_id, e)
+    
+    async def analyze_clause_async(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]], clause_id: int) -> ClauseAnalysis:
+        """Analyze a single T&C clause without blocking the event loop."""
+        # The sqlite cache calls block, so they run on a worker thread like the rest of the blocking work
+        cached = await asyncio.to_thread(self._get_cached_analysis, clause_text, clause_id)
+        if cached:
+            return cached
+        
+        try:
+            async with self._semaphore:
+                response = await self.aclient.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_clause_messages(clause_text, legal_context),
+                    temperature=0.3,
+                    max_tokens=1000,
+                    response_format={"type": "json_object"}
+                )
+            
+            return await asyncio.to_thread(self._parse_clause_response, response.choices[0].message.content, clause_text, clause_id)
+            
+        except Exception as e:
+            logger.error("Error in GPT analysis: %s", e)
+            return self._create_fallback_analysis(clause_text, clause_id, e)
+    
+    def analyze_clauses_batch(self, clauses: List[str], legal_contexts: List[Dict[str, List[Dict[str, Any]]]]) -> str:
+        """Submit all clause analyses as one OpenAI Batch API job and return its id."""
+        lines = []
+        for i, (clause_text, legal_context) in enumerate(zip(clauses, legal_contexts)):
+            lines.append(orjson.dumps({
+                "custom_id": f"clause-{i + 1}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": self._build_clause_messages(clause_text, legal_context),
+                    "temperature": 0.3,
+                    "max_tokens": 1000,
+                    "response_format": {"type": "json_object"}
+                }
+            }))
+        
+        batch_file = self.client.files.create(
+            file=("clauses.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        self._cache.execute(
+            "INSERT OR REPLACE INTO batch_jobs (batch_id, clauses) VALUES (?, ?)",
+            (batch.id, orjson.dumps(clauses).decode('utf-8'))
+        )
+        self._cache.commit()
+        return batch.id
+    
+    def get_batch_clauses(self, batch_id: str) -> Optional[List[str]]:
+        """Return the clauses submitted with a Batch API job, None for an unknown batch."""
+        row = self._cache.execute("SELECT clauses FROM batch_jobs WHERE batch_id = ?", (batch_id,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+    
+    def get_batch_results(self, batch_id: str, clauses: List[str]):
+        """Return the batch status and its clause analyses, or None while it is still running."""
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            return batch.status, None
+        
+        # Map every output line back to its clause by custom_id
+        contents = {}
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                item = orjson.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    contents[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        
+        clause_analyses = []
+        for i, clause_text in enumerate(clauses):
+            clause_id = i + 1
+            content = contents.get(f"clause-{clause_id}")
+            if content is None:
+                clause_analyses.append(self._create_fallback_analysis(clause_text, clause_id, "Dávkový požadavek selhal"))
+            else:
+                clause_analyses.append(self._parse_clause_response(content, clause_text, clause_id))
+        
+        return batch.status, clause_analyses
+    
+    def _build_clause_messages(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, str]]:
+        """Build the chat messages for a single clause analysis."""
         
         # Prepare the legal context for the prompt
         civil_context = "\n".join([
@@ -23,9 +178,8 @@ class GPTAnalyzer:
             for item in legal_context.get('criminal_code', [])[:3]
         ])
         
+        # Only the clause and its legal context vary between requests
         prompt = f"""
-        Analyzuj následující klauzuli z obchodních podmínek vzhledem k českému právu.
-
         KLAUZULE K ANALÝZE:
         {clause_text}
 
@@ -34,82 +188,97 @@ class GPTAnalyzer:
 
         RELEVANTNÍ USTANOVENÍ TRESTNÍHO ZÁKONÍKU:
         {criminal_context}
-
-        Proveď analýzu a poskytni odpověď ve formátu JSON s následujícími položkami:
-        {{
-            "risk_level": "Low/Medium/High/Critical",
-            "summary": "Jednoduché shrnutí co klauzule znamená pro uživatele (max 150 slov)",
-            "legal_conflicts": ["seznam možných konfliktů s právem"],
-            "explanation": "Podrobné vysvětlení proč je klauzule problematická, včetně konkrétních odkazů na paragrafy (pokud jsou konflikty)",
-            "relevant_laws": ["§1815 Občanského zákoníku", "§XYZ Trestního zákoníku"]
-        }}
-
-        Hodnotící kritéria pro riziko:
-        - Low: Standardní klauzule bez právních problémů
-        - Medium: Potenciálně problematická, ale obvykle vymahatelná
-        - High: Pravděpodobně neplatná nebo nespravedlivá vůči spotřebiteli
-        - Critical: Jasně v rozporu s právem nebo extrémně nespravedlivá
-
-        Odpovídej pouze v JSON formátu bez dalšího textu.
         """
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Jsi právní expert specializující se na české právo a analýzu obchodních podmínek. Odpovídáš pouze v JSON formátu."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Try to parse JSON response
-            try:
-                analysis_data = json.loads(content)
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                analysis_data = {
-                    "risk_level": "Medium",
-                    "summary": "Analýza nebyla dokončena kvůli technické chybě.",
-                    "legal_conflicts": [],
-                    "explanation": "Nepodařilo se dokončit analýzu této klauzule.",
-                    "relevant_laws": []
-                }
-            
-            return ClauseAnalysis(
-                clause_id=clause_id,
-                original_text=clause_text,
-                risk_level=RiskLevel(analysis_data.get("risk_level", "Medium")),
-                summary=analysis_data.get("summary", ""),
-                legal_conflicts=analysis_data.get("legal_conflicts", []),
-                explanation=analysis_data.get("explanation", ""),
-                relevant_laws=analysis_data.get("relevant_laws", [])
-            )
-            
-        except Exception as e:
-            print(f"Error in GPT analysis: {e}")
-            # Return a fallback analysis
-            return ClauseAnalysis(
-                clause_id=clause_id,
-                original_text=clause_text,
-                risk_level=RiskLevel.MEDIUM,
-                summary="Analýza nebyla dokončena kvůli technické chybě.",
-                legal_conflicts=[],
-                explanation=f"Chyba při analýze: {str(e)}",
-                relevant_laws=[]
-            )
+        return [
+            {"role": "system", "content": CLAUSE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
     
-    def generate_overall_summary(self, clause_analyses: List[ClauseAnalysis]) -> str:
-        """Generate an overall summary of the T&C analysis."""
+    def _parse_clause_response(self, content: str, clause_text: str, clause_id: int) -> ClauseAnalysis:
+        """Convert the content of a chat completion response into a ClauseAnalysis."""
+        content = content.strip()
+        
+        # Try to parse JSON response
+        try:
+            analysis_data = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Fallback if JSON parsing fails
+            analysis_data = {
+                "risk_level": "Medium",
+                "summary": "Analýza nebyla dokončena kvůli technické chybě.",
+                "legal_conflicts": [],
+                "explanation": "Nepodařilo se dokončit analýzu této klauzule.",
+                "relevant_laws": []
+            }
+            return self._build_clause_analysis(analysis_data, clause_text, clause_id)
         
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for analysis in clause_analyses:
-            risk_counts[analysis.risk_level.value] += 1
+        # An off-schema answer (unknown risk level, wrong types) falls back for this clause only and is not cached
+        try:
+            analysis = self._build_clause_analysis(analysis_data, clause_text, clause_id)
+        except (ValueError, TypeError, AttributeError) as e:
+            return self._create_fallback_analysis(clause_text, clause_id, e)
         
-        high_risk_clauses = [a for a in clause_analyses if a.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]]
+        self._store_cached_analysis(clause_text, analysis_data)
+        return analysis
+    
+    def _build_clause_analysis(self, analysis_data: dict, clause_text: str, clause_id: int) -> ClauseAnalysis:
+        """Create a ClauseAnalysis from parsed analysis data."""
+        return ClauseAnalysis(
+            clause_id=clause_id,
+            original_text=clause_text,
+            risk_level=RiskLevel(analysis_data.get("risk_level", "Medium")),
+            summary=analysis_data.get("summary", ""),
+            legal_conflicts=analysis_data.get("legal_conflicts", []),
+            explanation=analysis_data.get("explanation", ""),
+            relevant_laws=analysis_data.get("relevant_laws", [])
+        )
+    
+    def _cache_key(self, clause_text: str) -> str:
+        """Hash of the whitespace-normalized clause text."""
+        normalized = " ".join(clause_text.split())
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _get_cached_analysis(self, clause_text: str, clause_id: int) -> Optional[ClauseAnalysis]:
+        """Return a previously stored analysis of the same clause, if any."""
+        try:
+            with self._cache_lock:
+                row = self._cache.execute(
+                    "SELECT json FROM analysis_cache WHERE hash = ? AND model = ?",
+                    (self._cache_key(clause_text), self.model)
+                ).fetchone()
+            if row:
+                return self._build_clause_analysis(orjson.loads(row[0]), clause_text, clause_id)
+        except Exception as e:
+            logger.warning("Error reading analysis cache: %s", e)
+        return None
+    
+    def _store_cached_analysis(self, clause_text: str, analysis_data: dict):
+        """Store parsed analysis data for later reuse."""
+        try:
+            with self._cache_lock:
+                self._cache.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (hash, model, json) VALUES (?, ?, ?)",
+                    (self._cache_key(clause_text), self.model, orjson.dumps(analysis_data).decode('utf-8'))
+                )
+                self._cache.commit()
+        except Exception as e:
+            logger.warning("Error writing analysis cache: %s", e)
+    
+    def _create_fallback_analysis(self, clause_text: str, clause_id: int, error) -> ClauseAnalysis:
+        """Return a fallback analysis when the GPT call fails."""
+        return ClauseAnalysis(
+            clause_id=clause_id,
+            original_text=clause_text,
+            risk_level=RiskLevel.MEDIUM,
+            summary="Analýza nebyla dokončena kvůli technické chybě.",
+            legal_conflicts=[],
+            explanation=f"Chyba při analýze: {str(error)}",
+            relevant_laws=[]
+        )
+    
+    def generate_overall_summary(self, clause_analyses: List[ClauseAnalysis], risk_counts: Dict[str, int], high_risk_clauses: List[ClauseAnalysis]) -> str:
+        """Generate an overall summary of the T&C analysis from precomputed risk statistics."""
         
         prompt = f"""
         Na základě analýzy {len(clause_analyses)} klauzulí obchodních podmínek poskytni celkové shrnutí:
@@ -143,5 +312,5 @@ class GPTAnalyzer:
             return response.choices[0].message.content.strip()
             
         except Exception as e:
-            print(f"Error generating summary: {e}")
+            logger.warning("Error generating summary: %s", e)
             return f"Celkové shrnutí: Analyzováno {len(clause_analyses)} klauzulí s {risk_counts['High'] + risk_counts['Critical']} vysoce rizikovými ustanoveními."
\ No newline at end of file
@@ -1,9 +1,18 @@
 import os
-from openai import OpenAI
-from typing import Dict, List, Any
+import re
+import asyncio
+import weakref
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, List, Any, Optional
 from backend.models.simple_schemas import RiskLevel, ClauseAnalysis
 import json
 
+# Characters that matter when looking for the end of a JSON object
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+# Maximum number of clause analyses in flight at once, to stay under the OpenAI rate limits
+MAX_CONCURRENT_REQUESTS = 20
+
 class RealGPTAnalyzer:
     """Real GPT analyzer that uses OpenAI API for legal analysis."""
     
@@ -15,9 +24,57 @@ class RealGPTAnalyzer:
             raise ValueError("Please set a valid OPENAI_API_KEY in your environment variables or .env file")
         
         self.client = OpenAI(api_key=self.api_key)
+        
+        # Async clients and semaphores are bound to an event loop, keep one pair per loop
+        self._async_clients = weakref.WeakKeyDictionary()
     
     def analyze_clause(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]], clause_id: int) -> ClauseAnalysis:
         """Analyze a single T&C clause against legal context using GPT."""
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_clause_messages(clause_text, legal_context),
+                temperature=0.3,
+                max_tokens=1000,
+                response_format={"type": "json_object"}
+            )
+            
+            return self._parse_clause_response(response.choices[0].message.content, clause_text, clause_id)
+            
+        except Exception as e:
+            print(f"Error in GPT analysis: {e}")
+            # Return a fallback analysis
+            return self._create_fallback_analysis(clause_text, clause_id, str(e))
+    
+    async def analyze_clause_async(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]], clause_id: int) -> ClauseAnalysis:
+        """Analyze a single T&C clause without blocking, so many clauses can be in flight at once."""
+        client, semaphore = self._get_async_client()
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_clause_messages(clause_text, legal_context),
+                    temperature=0.3,
+                    max_tokens=1000,
+                    response_format={"type": "json_object"}
+                )
+            
+            return self._parse_clause_response(response.choices[0].message.content, clause_text, clause_id)
+            
+        except Exception as e:
+            print(f"Error in GPT analysis: {e}")
+            # Return a fallback analysis
+            return self._create_fallback_analysis(clause_text, clause_id, str(e))
+    
+    def _get_async_client(self):
+        """Return the AsyncOpenAI client and concurrency limit for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = (AsyncOpenAI(api_key=self.api_key), asyncio.Semaphore(MAX_CONCURRENT_REQUESTS))
+        return self._async_clients[loop]
+    
+    def _build_clause_messages(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, str]]:
+        """Build the chat messages for a single clause analysis."""
         
         # Prepare the legal context for the prompt
         civil_context = "\n".join([
@@ -60,51 +117,71 @@ class RealGPTAnalyzer:
         Odpovídej pouze v JSON formátu bez dalšího textu.
         """
         
+        return [
+            {"role": "system", "content": "Jsi právní expert specializující se na české právo a analýzu obchodních podmínek. Odpovídáš pouze v JSON formátu."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _parse_clause_response(self, content: str, clause_text: str, clause_id: int) -> ClauseAnalysis:
+        """Convert the content of a chat completion response into a ClauseAnalysis."""
+        content = content.strip()
+        
+        # Try to parse JSON response
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Jsi právní expert specializující se na české právo a analýzu obchodních podmínek. Odpovídáš pouze v JSON formátu."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Try to parse JSON response
-            try:
-                analysis_data = json.loads(content)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    try:
-                        analysis_data = json.loads(json_match.group())
-                    except json.JSONDecodeError:
-                        analysis_data = self._fallback_analysis(clause_text)
-                else:
+            analysis_data = json.loads(content)
+        except json.JSONDecodeError:
+            # If JSON parsing fails, try to extract JSON from the response
+            json_text = self._extract_json_object(content)
+            if json_text:
+                try:
+                    analysis_data = json.loads(json_text)
+                except json.JSONDecodeError:
                     analysis_data = self._fallback_analysis(clause_text)
-            
-            # Validate and ensure all required fields exist
-            analysis_data = self._validate_analysis_data(analysis_data, clause_text)
-            
-            return ClauseAnalysis(
-                clause_id=clause_id,
-                original_text=clause_text,
-                risk_level=RiskLevel(analysis_data.get("risk_level", "Medium")),
-                summary=analysis_data.get("summary", ""),
-                legal_conflicts=analysis_data.get("legal_conflicts", []),
-                explanation=analysis_data.get("explanation", ""),
-                relevant_laws=analysis_data.get("relevant_laws", [])
-            )
-            
-        except Exception as e:
-            print(f"Error in GPT analysis: {e}")
-            # Return a fallback analysis
-            return self._create_fallback_analysis(clause_text, clause_id, str(e))
+            else:
+                analysis_data = self._fallback_analysis(clause_text)
+        
+        # Validate and ensure all required fields exist
+        analysis_data = self._validate_analysis_data(analysis_data, clause_text)
+        
+        return ClauseAnalysis(
+            clause_id=clause_id,
+            original_text=clause_text,
+            risk_level=RiskLevel(analysis_data.get("risk_level", "Medium")),
+            summary=analysis_data.get("summary", ""),
+            legal_conflicts=analysis_data.get("legal_conflicts", []),
+            explanation=analysis_data.get("explanation", ""),
+            relevant_laws=analysis_data.get("relevant_laws", [])
+        )
+    
+    def _extract_json_object(self, content: str) -> Optional[str]:
+        """Return the first balanced {...} object in the response, skipping braces inside strings."""
+        start = content.find('{')
+        if start == -1:
+            return None
+        
+        depth = 0
+        in_string = False
+        escaped_pos = -1
+        for match in _JSON_TOKEN_RE.finditer(content, start):
+            pos = match.start()
+            if pos == escaped_pos:
+                continue
+            char = match.group()
+            if in_string:
+                if char == '\\':
+                    escaped_pos = pos + 1
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    return content[start:pos + 1]
+        
+        return None
     
     def _validate_analysis_data(self, data: dict, clause_text: str) -> dict:
         """Validate and clean the analysis data from GPT."""
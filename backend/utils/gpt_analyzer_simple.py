@@ -1,8 +1,23 @@
 import os
+from collections import Counter
 from typing import Dict, List, Any
 from backend.models.simple_schemas import RiskLevel, ClauseAnalysis
 import json
 import random
+import re
+
+# Simple risk assessment based on keywords, in priority order
+RISK_KEYWORDS = {
+    'critical': ['nevratný', 'bezpodmínečný', 'neomezený', 'vyloučení', 'zproštění odpovědnosti'],
+    'high': ['vyhrazujeme si právo', 'kdykoli změnit', 'bez předchozího upozornění', 'jednostranně'],
+    'medium': ['můžeme', 'podle našeho uvážení', 'v případě potřeby'],
+    'low': ['informujeme', 'snažíme se', 'doporučujeme']
+}
+
+# All keywords in one alternation so a clause is scanned once; the lookahead also reports overlapping hits
+KEYWORD_LEVELS = {keyword: risk_level for risk_level, keywords in RISK_KEYWORDS.items() for keyword in keywords}
+KEYWORD_RE = re.compile('(?=(' + '|'.join(re.escape(keyword) for keyword in sorted(KEYWORD_LEVELS, key=len, reverse=True)) + '))')
+RISK_PRIORITY = {risk_level: priority for priority, risk_level in enumerate(RISK_KEYWORDS)}
 
 class SimpleGPTAnalyzer:
     """Simplified GPT analyzer that provides mock analysis when GPT is not available."""
@@ -26,31 +41,29 @@ class SimpleGPTAnalyzer:
         
         clause_lower = clause_text.lower()
         
-        # Simple risk assessment based on keywords
-        risk_keywords = {
-            'critical': ['nevratný', 'bezpodmínečný', 'neomezený', 'vyloučení', 'zproštění odpovědnosti'],
-            'high': ['vyhrazujeme si právo', 'kdykoli změnit', 'bez předchozího upozornění', 'jednostranně'],
-            'medium': ['můžeme', 'podle našeho uvážení', 'v případě potřeby'],
-            'low': ['informujeme', 'snažíme se', 'doporučujeme']
-        }
+        # Highest-priority level among the keywords in the clause, a critical hit cannot be outranked
+        matched_level = None
+        for match in KEYWORD_RE.finditer(clause_lower):
+            risk_level = KEYWORD_LEVELS[match.group(1)]
+            if matched_level is None or RISK_PRIORITY[risk_level] < RISK_PRIORITY[matched_level]:
+                matched_level = risk_level
+                if risk_level == 'critical':
+                    break
         
         detected_risk = RiskLevel.LOW
         legal_conflicts = []
         relevant_laws = []
         
-        for risk_level, keywords in risk_keywords.items():
-            if any(keyword in clause_lower for keyword in keywords):
-                if risk_level == 'critical':
-                    detected_risk = RiskLevel.CRITICAL
-                    legal_conflicts.append("Možné porušení práv spotřebitele")
-                    relevant_laws.append("§1815 Občanského zákoníku")
-                elif risk_level == 'high' and detected_risk != RiskLevel.CRITICAL:
-                    detected_risk = RiskLevel.HIGH
-                    legal_conflicts.append("Nerovnováha v právech stran")
-                    relevant_laws.append("§1826 Občanského zákoníku")
-                elif risk_level == 'medium' and detected_risk not in [RiskLevel.CRITICAL, RiskLevel.HIGH]:
-                    detected_risk = RiskLevel.MEDIUM
-                break
+        if matched_level == 'critical':
+            detected_risk = RiskLevel.CRITICAL
+            legal_conflicts.append("Možné porušení práv spotřebitele")
+            relevant_laws.append("§1815 Občanského zákoníku")
+        elif matched_level == 'high':
+            detected_risk = RiskLevel.HIGH
+            legal_conflicts.append("Nerovnováha v právech stran")
+            relevant_laws.append("§1826 Občanského zákoníku")
+        elif matched_level == 'medium':
+            detected_risk = RiskLevel.MEDIUM
         
         # Generate summary based on risk level
         summaries = {
@@ -80,20 +93,18 @@ class SimpleGPTAnalyzer:
     def generate_overall_summary(self, clause_analyses: List[ClauseAnalysis]) -> str:
         """Generate overall summary."""
         
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for analysis in clause_analyses:
-            risk_counts[analysis.risk_level.value] += 1
+        risk_counts = Counter(analysis.risk_level for analysis in clause_analyses)
         
         total = len(clause_analyses)
-        high_risk = risk_counts['High'] + risk_counts['Critical']
+        high_risk = risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL]
         
-        if risk_counts['Critical'] > 0:
-            summary = f"KRITICKÉ RIZIKO: Nalezeno {risk_counts['Critical']} kritických klauzulí z celkem {total}. "
+        if risk_counts[RiskLevel.CRITICAL] > 0:
+            summary = f"KRITICKÉ RIZIKO: Nalezeno {risk_counts[RiskLevel.CRITICAL]} kritických klauzulí z celkem {total}. "
             summary += "Doporučujeme konzultaci s právníkem před přijetím těchto podmínek."
-        elif risk_counts['High'] > 0:
-            summary = f"VYSOKÉ RIZIKO: Nalezeno {risk_counts['High']} vysoce rizikových klauzulí z celkem {total}. "
+        elif risk_counts[RiskLevel.HIGH] > 0:
+            summary = f"VYSOKÉ RIZIKO: Nalezeno {risk_counts[RiskLevel.HIGH]} vysoce rizikových klauzulí z celkem {total}. "
             summary += "Podmínky obsahují ustanovení, která mohou být problematická."
-        elif risk_counts['Medium'] > risk_counts['Low']:
+        elif risk_counts[RiskLevel.MEDIUM] > risk_counts[RiskLevel.LOW]:
             summary = f"STŘEDNÍ RIZIKO: Většina z {total} klauzulí vyžaduje pozornost. "
             summary += "Doporučuje se pečlivé prostudování před přijetím."
         else:
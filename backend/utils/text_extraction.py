@@ -1,32 +1,46 @@
 import io
-from typing import Union
+from typing import Union, BinaryIO
 import PyPDF2
 from docx import Document
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file content."""
+# PyMuPDF parses PDFs in C, fallback to PyPDF2 if not installed
+try:
+    import pymupdf
+    USE_PYMUPDF = True
+except ImportError:
+    USE_PYMUPDF = False
+
+def _as_stream(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+    """Wrap raw bytes in a stream, pass file objects through unchanged."""
+    if isinstance(file_content, bytes):
+        return io.BytesIO(file_content)
+    return file_content
+
+def extract_text_from_pdf(file_content: Union[bytes, BinaryIO]) -> str:
+    """Extract text from PDF file content or a binary file object."""
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        if USE_PYMUPDF:
+            data = file_content if isinstance(file_content, bytes) else file_content.read()
+            with pymupdf.open(stream=data, filetype='pdf') as doc:
+                return "\n".join(page.get_text() for page in doc).strip()
+        
+        pdf_reader = PyPDF2.PdfReader(_as_stream(file_content))
+        return "\n".join(page.extract_text() or "" for page in pdf_reader.pages).strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX file content."""
+def extract_text_from_docx(file_content: Union[bytes, BinaryIO]) -> str:
+    """Extract text from DOCX file content or a binary file object."""
     try:
-        doc = Document(io.BytesIO(file_content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        doc = Document(_as_stream(file_content))
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from DOCX: {str(e)}")
 
-def extract_text_from_txt(file_content: bytes) -> str:
-    """Extract text from TXT file content."""
+def extract_text_from_txt(file_content: Union[bytes, BinaryIO]) -> str:
+    """Extract text from TXT file content or a binary file object."""
+    if not isinstance(file_content, bytes):
+        file_content = file_content.read()
     try:
         return file_content.decode('utf-8').strip()
     except UnicodeDecodeError:
@@ -35,7 +49,7 @@ def extract_text_from_txt(file_content: bytes) -> str:
         except Exception as e:
             raise ValueError(f"Error extracting text from TXT: {str(e)}")
 
-def extract_text_from_file(file_content: bytes, filename: str) -> str:
+def extract_text_from_file(file_content: Union[bytes, BinaryIO], filename: str) -> str:
     """Extract text from file based on its extension."""
     filename_lower = filename.lower()
     
@@ -1,78 +1,100 @@
 import re
-from typing import List
+import os
+import logging
+import hashlib
+import sqlite3
+import numpy as np
+from typing import List, Dict
 from sentence_transformers import SentenceTransformer
 
+logger = logging.getLogger(__name__)
+
 class TextProcessor:
+    # Clause separators: numbered sections, bullet points or paragraph breaks
+    _SEGMENT_RE = re.compile(r'\n\s*(?:\d+\.\s*|\(\d+\)\s*|[a-z]\)\s*|[A-Z]\.\s*|[-•]\s*)|\n{2,}')
+    _SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+    _WHITESPACE_RE = re.compile(r'\s+')
+    
     def __init__(self):
         # Initialize the same embedding model that was likely used for the legal texts
         self.embedding_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        
+        # Cache of float16 clause embeddings keyed by content hash
+        self._cache = sqlite3.connect(os.getenv('EMBEDDING_CACHE_DB', 'embedding_cache.sqlite3'), check_same_thread=False)
+        self._cache.execute("CREATE TABLE IF NOT EXISTS embedding_cache_f16 (hash TEXT PRIMARY KEY, vec BLOB)")
+        self._cache.commit()
     
     def segment_terms_conditions(self, text: str) -> List[str]:
         """Segment T&C text into individual clauses."""
-        # Clean up the text
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Split by all clause separators in a single pass, before whitespace is collapsed
+        splits = (self._WHITESPACE_RE.sub(' ', s).strip() for s in self._SEGMENT_RE.split(text))
         
-        # Split by common clause separators
-        # Look for numbered sections, bullet points, or paragraph breaks
-        patterns = [
-            r'\n\s*\d+\.\s*',  # 1. 2. 3. etc.
-            r'\n\s*\(\d+\)\s*',  # (1) (2) (3) etc.
-            r'\n\s*[a-z]\)\s*',  # a) b) c) etc.
-            r'\n\s*[A-Z]\.\s*',  # A. B. C. etc.
-            r'\n\s*-\s*',  # bullet points
-            r'\n\s*•\s*',  # bullet points
-            r'\n\n+'  # double line breaks
-        ]
-        
-        # Try to split by patterns
-        clauses = []
-        remaining_text = text
+        # Keep the splits that are substantial (more than 50 characters)
+        clauses = [s for s in splits if len(s) > 50]
+        if len(clauses) < 2:
+            clauses = []
         
-        for pattern in patterns:
-            if re.search(pattern, remaining_text):
-                splits = re.split(pattern, remaining_text)
-                # Keep the splits that are substantial (more than 50 characters)
-                substantial_splits = [s.strip() for s in splits if len(s.strip()) > 50]
-                if len(substantial_splits) > 1:
-                    clauses = substantial_splits
-                    break
+        # Clean up the text
+        text = self._WHITESPACE_RE.sub(' ', text).strip()
         
         # If no good splits found, try sentence-based splitting for long text
         if not clauses and len(text) > 500:
-            sentences = re.split(r'(?<=[.!?])\s+', text)
+            sentences = self._SENTENCE_RE.split(text)
             # Group sentences into clauses (3-5 sentences each)
             clause_size = max(3, len(sentences) // 10)  # Aim for around 10 clauses
-            clauses = []
-            current_clause = []
             
-            for sentence in sentences:
-                current_clause.append(sentence)
-                if len(current_clause) >= clause_size:
-                    clauses.append(' '.join(current_clause))
-                    current_clause = []
-            
-            # Add remaining sentences as final clause
-            if current_clause:
-                clauses.append(' '.join(current_clause))
+            # Consecutive runs of clause_size sentences, the remaining sentences form the final clause
+            clauses = [' '.join(sentences[i:i + clause_size]) for i in range(0, len(sentences), clause_size)]
         
         # If still no good clauses, return the whole text as one clause
         if not clauses:
             clauses = [text]
         
-        # Clean up clauses and filter out very short ones
-        final_clauses = []
-        for clause in clauses:
-            clause = clause.strip()
-            if len(clause) > 30:  # Minimum clause length
-                final_clauses.append(clause)
+        # Filter out very short clauses, every clause is already stripped
+        final_clauses = [clause for clause in clauses if len(clause) > 30]  # Minimum clause length
         
         return final_clauses if final_clauses else [text]
     
-    def get_text_embedding(self, text: str) -> List[float]:
+    def get_text_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for text using the same model as the legal codes."""
+        embeddings = self.get_text_embeddings_batch([text])
+        return embeddings[0] if len(embeddings) else np.empty(0, dtype=np.float16)
+    
+    def get_text_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate float16 embeddings for several texts, encoding only those not cached yet."""
         try:
-            embedding = self.embedding_model.encode(text)
-            return embedding.tolist()
+            hashes = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+            embeddings = self._get_cached_embeddings(hashes)
+            
+            # Encode cache misses in a single batched call
+            missing = {h: text for h, text in zip(hashes, texts) if h not in embeddings}
+            if missing:
+                encoded = self.embedding_model.encode(list(missing.values()), batch_size=32, show_progress_bar=False, convert_to_numpy=True)
+                new_embeddings = dict(zip(missing.keys(), encoded.astype(np.float16)))
+                self._cache.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache_f16 (hash, vec) VALUES (?, ?)",
+                    [(h, vec.tobytes()) for h, vec in new_embeddings.items()]
+                )
+                self._cache.commit()
+                embeddings.update(new_embeddings)
+            
+            # Half the bytes of float32, searches upcast before computing similarities
+            return np.vstack([embeddings[h] for h in hashes]) if hashes else np.empty((0, 0), dtype=np.float16)
         except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return []
\ No newline at end of file
+            logger.error("Error generating embeddings: %s", e)
+            return np.empty((0, 0), dtype=np.float16)
+    
+    def _get_cached_embeddings(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Look up cached embeddings for the given hashes."""
+        cached = {}
+        unique_hashes = list(set(hashes))
+        
+        # Stay below SQLite's host parameter limit
+        for start in range(0, len(unique_hashes), 500):
+            chunk = unique_hashes[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._cache.execute(f"SELECT hash, vec FROM embedding_cache_f16 WHERE hash IN ({placeholders})", chunk)
+            for h, vec in rows:
+                cached[h] = np.frombuffer(vec, dtype=np.float16)
+        
+        return cached
\ No newline at end of file
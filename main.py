@@ -2,11 +2,13 @@
 
 import sys
 import os
-import json
+import re
+import asyncio
 import uuid
+from collections import Counter
 from typing import Optional, List
 import sqlite3
-import hashlib
+import numpy as np
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -18,46 +20,314 @@ sys.path.insert(0, '/home/runner/work/termscon/termscon')
 from backend.models.simple_schemas import AnalysisResult, OverallSummary, RiskLevel
 from backend.utils.text_processing_simple import SimpleTextProcessor
 
-# Try to import real GPT analyzer, fallback to simple if OpenAI not configured
+from backend.utils.gpt_analyzer_simple import SimpleGPTAnalyzer
+
+# sqlite-vec provides a native KNN index for the Criminal Code, fallback to mock context if not installed
 try:
-    from backend.utils.gpt_analyzer_real import RealGPTAnalyzer
-    USE_REAL_GPT = True
+    import sqlite_vec
+    USE_SQLITE_VEC = True
 except ImportError:
-    USE_REAL_GPT = False
+    USE_SQLITE_VEC = False
 
-from backend.utils.gpt_analyzer_simple import SimpleGPTAnalyzer
+# SimSIMD scores the in-memory float16 matrix with native SIMD kernels when sqlite-vec is not installed
+try:
+    import simsimd as simd
+    USE_SIMSIMD = True
+except ImportError:
+    USE_SIMSIMD = False
+
+# Words of a clause used as FTS5 keywords, short words carry little legal meaning
+KEYWORD_RE = re.compile(r'\w{4,}')
+MAX_KEYWORDS = 32
+MAX_KEYWORD_CANDIDATES = 200
+
+# Bump when the layout of the sqlite-vec sidecar index changes
+VEC_INDEX_VERSION = 2
+
+# Candidates taken from the int8 index per requested result, re-ranked with the float32 vectors
+RERANK_FACTOR = 4
+
+# Paragraphs less similar than this are not relevant enough to include
+MIN_SIMILARITY = 0.3
+
+# Clauses whose legal context is searched together, their GPT calls start while the next batch is searched
+CONTEXT_BATCH_SIZE = 8
+
+# Legal context used where no real search is available, built once instead of per clause
+MOCK_CIVIL_CONTEXT = (
+    {
+        'text': '§1815 Občanského zákoníku: Smlouva je neplatná, pokud odporuje zákonu nebo dobrým mravům.',
+        'metadata': {'paragraph': '1815'}
+    },
+    {
+        'text': '§1826 Občanského zákoníku: Podmínky smlouvy musí být spravedlivé pro obě strany.',
+        'metadata': {'paragraph': '1826'}
+    }
+)
+MOCK_CRIMINAL_CONTEXT = (
+    {
+        'paragraph_number': '1',
+        'text': '§1 Trestního zákoníku: Čin je trestný, jen pokud jeho trestnost byla zákonem stanovena dříve.',
+        'similarity': 0.7
+    },
+)
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Scale each vector so its largest component maps to 127, cosine distance ignores the scale."""
+    # Reductions and one in-place rounded buffer, a full matrix is never copied more than once
+    max_abs = np.maximum(vectors.max(axis=-1, keepdims=True), -vectors.min(axis=-1, keepdims=True))
+    scales = np.divide(127, max_abs, out=np.ones_like(max_abs), where=max_abs > 0)
+    scaled = vectors * scales
+    np.rint(scaled, out=scaled)
+    return scaled.astype(np.int8)
 
 class SimplifiedVectorDB:
     def __init__(self, chroma_db_path: str, criminal_db_path: str):
         self.chroma_db_path = chroma_db_path
         self.criminal_db_path = criminal_db_path
+        self._vec_conn = self._open_criminal_index() if USE_SQLITE_VEC else None
+        
+        # Without the sqlite-vec index, search an in-memory matrix of unit vectors instead
+        self._criminal_paragraphs, self._criminal_matrix = (None, None) if self._vec_conn is not None else self._load_criminal_matrix()
     
-    def get_legal_context(self, query_embedding: List[float], n_results: int = 3) -> dict:
-        """Mock legal context retrieval."""
-        # Mock some legal context
-        civil_context = [
-            {
-                'text': '§1815 Občanského zákoníku: Smlouva je neplatná, pokud odporuje zákonu nebo dobrým mravům.',
-                'metadata': {'paragraph': '1815'}
-            },
+    def _connect_index(self, index_path: str) -> sqlite3.Connection:
+        """Connect to the sidecar index database with the sqlite-vec extension loaded."""
+        conn = sqlite3.connect(index_path, check_same_thread=False)
+        try:
+            conn.enable_load_extension(True)
+            sqlite_vec.load(conn)
+            conn.enable_load_extension(False)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+    
+    def _open_criminal_index(self) -> Optional[sqlite3.Connection]:
+        """Open the sqlite-vec index of Criminal Code embeddings, building it on first use."""
+        index_path = os.path.splitext(self.criminal_db_path)[0] + '_vec.sqlite'
+        conn = None
+        rebuild = not os.path.exists(index_path)
+        try:
+            conn = self._connect_index(index_path)
+            rebuild = (conn.execute("PRAGMA user_version").fetchone()[0] != VEC_INDEX_VERSION
+                       or os.path.getmtime(index_path) < os.path.getmtime(self.criminal_db_path))
+            if rebuild:
+                conn.close()
+                os.remove(index_path)
+                conn = self._connect_index(index_path)
+            
+            # Paragraph texts and float32 vectors stay in the original database
+            conn.execute("ATTACH DATABASE ? AS code", (self.criminal_db_path,))
+            
+            if rebuild:
+                rows = conn.execute("SELECT paragraf_id, embedding FROM code.embeddings").fetchall()
+                quantized = quantize_int8(np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]))
+                
+                # int8 vectors take a quarter of the float32 bandwidth during the KNN scan
+                conn.execute(f"CREATE VIRTUAL TABLE legal_vec USING vec0(embedding int8[{quantized.shape[1]}] distance_metric=cosine)")
+                conn.executemany(
+                    "INSERT INTO legal_vec(rowid, embedding) VALUES (?, vec_int8(?))",
+                    [(paragraf_id, vector.tobytes()) for (paragraf_id, _), vector in zip(rows, quantized)]
+                )
+                
+                # Full-text index of the paragraph texts, "zakonik" matches "zákoník"
+                conn.execute("CREATE VIRTUAL TABLE legal_fts USING fts5(text, tokenize='unicode61 remove_diacritics 2')")
+                conn.execute("INSERT INTO legal_fts(rowid, text) SELECT id, text FROM code.paragrafy")
+                
+                conn.execute(f"PRAGMA user_version = {VEC_INDEX_VERSION}")
+                conn.commit()
+            
+            return conn
+        except Exception as e:
+            print(f"Error opening criminal code vector index: {e}")
+            if conn is not None:
+                conn.close()
+            # Do not leave a half-built or empty index behind to be picked up as fresh next time
+            if rebuild and os.path.exists(index_path):
+                os.remove(index_path)
+            return None
+    
+    def _load_criminal_matrix(self):
+        """Load the Criminal Code once as row-contiguous unit vectors for brute-force search."""
+        try:
+            conn = sqlite3.connect(f"file:{self.criminal_db_path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute(
+                    "SELECT p.cislo, p.text, e.embedding FROM paragrafy AS p JOIN embeddings AS e ON e.paragraf_id = p.id"
+                ).fetchall()
+            finally:
+                conn.close()
+            
+            matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            matrix /= norms
+            
+            # float16 halves the bytes scanned per query, NumPy has no fast float16 matmul so only with SimSIMD
+            return [(cislo, text) for cislo, text, _ in rows], matrix.astype(np.float16) if USE_SIMSIMD else matrix
+        except Exception as e:
+            print(f"Error loading criminal code embeddings: {e}")
+            return None, None
+    
+    def _search_criminal_matrix(self, query_embedding: List[float], n_results: int) -> List[dict]:
+        """Cosine similarity against every paragraph in one matrix-vector product."""
+        return self._search_criminal_matrix_batch([query_embedding], n_results)[0]
+    
+    def _search_criminal_matrix_batch(self, query_embeddings: List[List[float]], n_results: int) -> List[List[dict]]:
+        """Cosine similarities of several queries against every paragraph in one matrix product."""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(self._criminal_matrix.dtype)
+        if USE_SIMSIMD:
+            similarities = np.asarray(simd.cdist(queries, self._criminal_matrix, metric='dot'))
+        else:
+            similarities = queries @ self._criminal_matrix.T
+        
+        # argpartition finds the top n of each row in linear time, only those are sorted
+        n_results = min(n_results, similarities.shape[1])
+        top = np.argpartition(similarities, -n_results, axis=1)[:, -n_results:]
+        order = np.argsort(np.take_along_axis(similarities, top, axis=1), axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        
+        return [
+            [
+                {
+                    'paragraph_number': self._criminal_paragraphs[i][0],
+                    'text': self._criminal_paragraphs[i][1],
+                    'similarity': float(row_similarities[i])
+                }
+                for i in row
+                if row_similarities[i] > MIN_SIMILARITY
+            ]
+            for row_similarities, row in zip(similarities, top)
+        ]
+    
+    def _search_criminal_code(self, query_embedding: List[float], n_results: int) -> List[dict]:
+        """KNN search of the Criminal Code, MATCH with k lets sqlite-vec use its native index scan."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        # Approximate candidates from the int8 index, exact float32 cosine for the final order
+        rows = self._vec_conn.execute(
+            """
+            SELECT p.cislo, p.text, vec_distance_cosine(e.embedding, ?) AS distance
+            FROM (SELECT rowid FROM legal_vec WHERE embedding MATCH vec_int8(?) AND k = ?) AS v
+            JOIN code.embeddings AS e ON e.paragraf_id = v.rowid
+            JOIN code.paragrafy AS p ON p.id = v.rowid
+            ORDER BY distance
+            LIMIT ?
+            """,
+            (query.tobytes(), quantize_int8(query).tobytes(), n_results * RERANK_FACTOR, n_results)
+        ).fetchall()
+        
+        return [
             {
-                'text': '§1826 Občanského zákoníku: Podmínky smlouvy musí být spravedlivé pro obě strany.',
-                'metadata': {'paragraph': '1826'}
+                'paragraph_number': cislo,
+                'text': text,
+                'similarity': 1 - distance
             }
+            for cislo, text, distance in rows
+            if 1 - distance > MIN_SIMILARITY
         ]
+    
+    def _search_criminal_code_by_keywords(self, query_text: str, query_embedding: List[float], n_results: int) -> List[dict]:
+        """Rank paragraphs sharing keywords with the query by embedding distance."""
+        keywords = list(dict.fromkeys(word.lower() for word in KEYWORD_RE.findall(query_text)))[:MAX_KEYWORDS]
+        if not keywords:
+            return []
+        
+        # Query the table (not the column) so the FTS index is used
+        rows = self._vec_conn.execute(
+            """
+            SELECT p.cislo, p.text, vec_distance_cosine(e.embedding, ?) AS distance
+            FROM code.embeddings AS e
+            JOIN code.paragrafy AS p ON p.id = e.paragraf_id
+            WHERE e.paragraf_id IN (SELECT rowid FROM legal_fts WHERE legal_fts MATCH ? ORDER BY rank LIMIT ?)
+            ORDER BY distance
+            LIMIT ?
+            """,
+            (
+                np.asarray(query_embedding, dtype=np.float32).tobytes(),
+                ' OR '.join(f'"{keyword}"' for keyword in keywords),
+                MAX_KEYWORD_CANDIDATES,
+                n_results
+            )
+        ).fetchall()
         
-        criminal_context = [
+        return [
             {
-                'paragraph_number': '1',
-                'text': '§1 Trestního zákoníku: Čin je trestný, jen pokud jeho trestnost byla zákonem stanovena dříve.',
-                'similarity': 0.7
+                'paragraph_number': cislo,
+                'text': text,
+                'similarity': 1 - distance
             }
+            for cislo, text, distance in rows
+            if 1 - distance > MIN_SIMILARITY
         ]
+    
+    @staticmethod
+    def _merge_by_similarity(results: List[dict], more_results: List[dict], n_results: int) -> List[dict]:
+        """The n most similar paragraphs of two result lists, each paragraph once."""
+        merged = {}
+        for result in results + more_results:
+            key = (result['paragraph_number'], result['text'])
+            if key not in merged or result['similarity'] > merged[key]['similarity']:
+                merged[key] = result
+        return sorted(merged.values(), key=lambda result: result['similarity'], reverse=True)[:n_results]
+    
+    def get_legal_context(self, query_embedding: Optional[List[float]], n_results: int = 3, query_text: Optional[str] = None) -> dict:
+        """Legal context retrieval, real Criminal Code search when the vector index and a real query embedding are available."""
+        # Mock some legal context
+        civil_context = list(MOCK_CIVIL_CONTEXT)
+        criminal_context = list(MOCK_CRIMINAL_CONTEXT)
+        
+        if query_embedding is None:
+            # Without an embedding from the model of the code, a search would only return arbitrary paragraphs
+            pass
+        elif self._vec_conn is not None:
+            try:
+                # Keyword candidates are merged with the KNN ones, both scored by exact cosine, so BM25 never gates recall
+                results = self._search_criminal_code(query_embedding, n_results)
+                if query_text:
+                    results = self._merge_by_similarity(
+                        results, self._search_criminal_code_by_keywords(query_text, query_embedding, n_results), n_results
+                    )
+                criminal_context = results or criminal_context
+            except Exception as e:
+                print(f"Error searching criminal code: {e}")
+        elif self._criminal_matrix is not None:
+            try:
+                criminal_context = self._search_criminal_matrix(query_embedding, n_results) or criminal_context
+            except Exception as e:
+                print(f"Error searching criminal code: {e}")
         
         return {
             'civil_code': civil_context,
             'criminal_code': criminal_context
         }
+    
+    def get_legal_context_batch(self, query_embeddings: List[Optional[List[float]]], n_results: int = 3, query_texts: Optional[List[str]] = None) -> List[dict]:
+        """Legal context for several clauses, the in-memory matrix is searched with one product for all of them."""
+        if query_texts is None:
+            query_texts = [None] * len(query_embeddings)
+        
+        # sqlite-vec answers one KNN query at a time, and without an index or real embeddings there is only mock context
+        if self._vec_conn is not None or self._criminal_matrix is None or any(query_embedding is None for query_embedding in query_embeddings):
+            return [
+                self.get_legal_context(query_embedding, n_results, query_text)
+                for query_embedding, query_text in zip(query_embeddings, query_texts)
+            ]
+        
+        try:
+            criminal_contexts = self._search_criminal_matrix_batch(query_embeddings, n_results)
+        except Exception as e:
+            print(f"Error searching criminal code: {e}")
+            criminal_contexts = [[] for _ in query_embeddings]
+        
+        return [
+            {
+                'civil_code': list(MOCK_CIVIL_CONTEXT),
+                'criminal_code': criminal_context or list(MOCK_CRIMINAL_CONTEXT)
+            }
+            for criminal_context in criminal_contexts
+        ]
 
 class SimpleApp:
     def __init__(self):
@@ -67,11 +337,14 @@ class SimpleApp:
         )
         self.text_processor = SimpleTextProcessor()
         
-        # Try to use real GPT analyzer, fallback to mock if not configured
-        if USE_REAL_GPT:
+        # Try to use real GPT analyzer, fallback to mock if not configured; openai is only imported when a key is set
+        if os.getenv('OPENAI_API_KEY'):
             try:
+                from backend.utils.gpt_analyzer_real import RealGPTAnalyzer
                 self.gpt_analyzer = RealGPTAnalyzer()
                 print("✅ Using real OpenAI GPT analyzer")
+            except ImportError:
+                self.gpt_analyzer = SimpleGPTAnalyzer()
             except ValueError as e:
                 print(f"⚠️  OpenAI API not configured: {e}")
                 print("📝 Using mock analyzer instead. Set OPENAI_API_KEY environment variable to use real GPT analysis.")
@@ -81,12 +354,22 @@ class SimpleApp:
     
     def analyze_text(self, text_content: str) -> AnalysisResult:
         """Analyze terms and conditions text."""
+        return asyncio.run(self.analyze_text_async(text_content))
+    
+    async def analyze_text_async(self, text_content: str) -> AnalysisResult:
+        """Analyze terms and conditions text with all clause analyses running concurrently."""
+        async for item in self.analyze_text_stream(text_content):
+            result = item
+        return result
+    
+    async def analyze_text_stream(self, text_content: str):
+        """Yield each ClauseAnalysis as soon as it is done, then the complete AnalysisResult."""
         
         if not text_content.strip():
             raise ValueError("No text content provided")
         
         # Generate document ID
-        document_id = str(uuid.uuid4())
+        document_id = uuid.uuid4().hex
         
         # Segment the document
         clauses = self.text_processor.segment_terms_conditions(text_content)
@@ -94,53 +377,81 @@ class SimpleApp:
         if not clauses:
             raise ValueError("Could not segment document into clauses")
         
-        # Analyze each clause
-        clause_analyses = []
+        # Finished tasks are queued as they complete, the retriever's own task included
+        done = asyncio.Queue()
+        tasks = []
         
-        for i, clause in enumerate(clauses):
-            # Get mock embedding
-            clause_embedding = self.text_processor.get_text_embedding_mock(clause)
-            
-            # Get legal context
-            legal_context = self.vector_db.get_legal_context(clause_embedding)
-            
-            # Analyze with GPT (mock)
-            analysis = self.gpt_analyzer.analyze_clause(clause, legal_context, i + 1)
-            clause_analyses.append(analysis)
+        async def retrieve():
+            # Legal context is searched batch by batch off the event loop, GPT calls start per batch
+            for start in range(0, len(clauses), CONTEXT_BATCH_SIZE):
+                batch = clauses[start:start + CONTEXT_BATCH_SIZE]
+                legal_contexts = await asyncio.to_thread(self._get_legal_context_batch, batch)
+                for i, (clause, legal_context) in enumerate(zip(batch, legal_contexts), start):
+                    task = asyncio.ensure_future(self._analyze_clause_async(clause, legal_context, i + 1))
+                    task.add_done_callback(done.put_nowait)
+                    tasks.append(task)
         
-        # Calculate overall summary
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for analysis in clause_analyses:
-            risk_counts[analysis.risk_level.value] += 1
+        retriever = asyncio.ensure_future(retrieve())
+        retriever.add_done_callback(done.put_nowait)
+        clause_analyses = [None] * len(clauses)
+        try:
+            # Hand out each analysis in completion order, the caller can show it right away
+            for _ in range(len(clauses) + 1):
+                task = await done.get()
+                if task is retriever:
+                    task.result()  # Surfaces a failed search
+                    continue
+                analysis = task.result()
+                clause_analyses[analysis.clause_id - 1] = analysis
+                yield analysis
+        finally:
+            # A consumer that stops early (a closed connection) does not leave the search or GPT calls running
+            retriever.cancel()
+            for task in tasks:
+                task.cancel()
+        
+        # Calculate overall summary, counted by enum member to skip the .value lookups
+        risk_counts = Counter(analysis.risk_level for analysis in clause_analyses)
         
         # Determine overall risk level
-        if risk_counts["Critical"] > 0:
+        if risk_counts[RiskLevel.CRITICAL] > 0:
             overall_risk = RiskLevel.CRITICAL
-        elif risk_counts["High"] > 0:
+        elif risk_counts[RiskLevel.HIGH] > 0:
             overall_risk = RiskLevel.HIGH
-        elif risk_counts["Medium"] > risk_counts["Low"]:
+        elif risk_counts[RiskLevel.MEDIUM] > risk_counts[RiskLevel.LOW]:
             overall_risk = RiskLevel.MEDIUM
         else:
             overall_risk = RiskLevel.LOW
         
-        # Generate overall summary text
-        overview_text = self.gpt_analyzer.generate_overall_summary(clause_analyses)
+        # Generate overall summary text, the real analyzer makes a blocking API call for it
+        overview_text = await asyncio.to_thread(self.gpt_analyzer.generate_overall_summary, clause_analyses)
         
         overall_summary = OverallSummary(
             overall_risk_score=overall_risk,
             total_clauses=len(clause_analyses),
-            high_risk_count=risk_counts["High"] + risk_counts["Critical"],
-            medium_risk_count=risk_counts["Medium"],
-            low_risk_count=risk_counts["Low"],
+            high_risk_count=risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL],
+            medium_risk_count=risk_counts[RiskLevel.MEDIUM],
+            low_risk_count=risk_counts[RiskLevel.LOW],
             overview=overview_text
         )
         
-        return AnalysisResult(
+        yield AnalysisResult(
             document_id=document_id,
             overall_summary=overall_summary,
             clause_analyses=clause_analyses
         )
 
+    def _get_legal_context_batch(self, clauses: List[str]) -> List[dict]:
+        """Legal context of several clauses, mock context until the clauses are embedded with the model of the code."""
+        # The mock embedding is a hash of the text, searching the real Criminal Code vectors with it ranks paragraphs at random
+        return self.vector_db.get_legal_context_batch([None] * len(clauses), query_texts=clauses)
+    
+    async def _analyze_clause_async(self, clause: str, legal_context: dict, clause_id: int):
+        """Analyze one clause, in a worker thread if the analyzer has no async API."""
+        if hasattr(self.gpt_analyzer, 'analyze_clause_async'):
+            return await self.gpt_analyzer.analyze_clause_async(clause, legal_context, clause_id)
+        return await asyncio.to_thread(self.gpt_analyzer.analyze_clause, clause, legal_context, clause_id)
+
 def main():
     """Main function for testing the application."""
     
@@ -1,6 +1,29 @@
+import threading
+
 from django.apps import AppConfig
 
 
 class AnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'termscon_django.analyzer'
+
+    def ready(self):
+        self._terms_analyzer = None
+        self._terms_analyzer_lock = threading.Lock()
+
+    @property
+    def terms_analyzer(self):
+        """Analyzer shared by all requests, built on first use; waits for a warm-up already in progress."""
+        with self._terms_analyzer_lock:
+            if self._terms_analyzer is None:
+                from .views import TermsAnalyzer
+                self._terms_analyzer = TermsAnalyzer()
+            return self._terms_analyzer
+
+    def warm_up(self):
+        """Build the analyzer and load the legal code embeddings off the request path."""
+        threading.Thread(target=self._warm_up, name='analyzer-warm-up', daemon=True).start()
+
+    def _warm_up(self):
+        # One throwaway query loads both legal codes and the query embedding model
+        self.terms_analyzer.vector_db.get_legal_context('warmup')
@@ -1,23 +1,220 @@
 import os
-from openai import OpenAI
-from typing import Dict, List, Any
+import logging
+import re
+import asyncio
+import hashlib
+import sqlite3
+import weakref
+import httpx
+from collections import Counter
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, List, Any, Optional
 from .simple_schemas import RiskLevel, ClauseAnalysis
-import json
+from .hashing import text_hash
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of clause analyses in flight at once, to stay under the OpenAI rate limits
+MAX_CONCURRENT_REQUESTS = 20
+
+# Documents with fewer clauses get a summary built from the risk counts instead of a GPT call
+LLM_SUMMARY_MIN_CLAUSES = 20
+
+# Invariant skeleton of the clause prompt, only the clause, context and laws change per call
+CLAUSE_PROMPT_TEMPLATE = """Analyzuj klauzuli T&C podle českého práva:
+KLAUZULE: "{clause}"
+KONTEXT: {context}
+
+Odpověz JSON:
+{{"risk":"Low/Medium/High/Critical","summary":"krátké shrnutí","conflicts":["konflikty"],"explanation":"důvod rizika","laws":["{laws}"]}}"""
+
+# Several clauses analyzed in one request, each keeps the fields of the single clause answer
+BATCH_PROMPT_TEMPLATE = """Analyzuj {count} klauzulí T&C podle českého práva:
+{clauses}
+
+Odpověz JSON se seznamem výsledků ve stejném pořadí jako klauzule:
+{{"clauses":[{{"risk":"Low/Medium/High/Critical","summary":"krátké shrnutí","conflicts":["konflikty"],"explanation":"důvod rizika","laws":["§1815 Občanského zákoníku"]}}]}}"""
+
+BATCH_CLAUSE_TEMPLATE = """{number}. KLAUZULE: "{clause}"
+KONTEXT: {context}
+ZÁKONY: {laws}"""
+
+# Outermost braces of a JSON object wrapped in other text
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# Connection pool shared by the concurrent clause requests, kept alive between calls
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# HTTP/2 multiplexes the clause requests over few connections, needs the h2 package (httpx[http2])
+try:
+    import h2
+    USE_HTTP2 = True
+except ImportError:
+    USE_HTTP2 = False
 
 class OptimizedGPTAnalyzer:
     """Cost-optimized GPT analyzer that uses concise prompts and real legal context."""
     
-    def __init__(self):
+    def __init__(self, legal_db_version: str = ''):
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.model = os.getenv('OPENAI_MODEL', 'gpt-5')
         
+        # Part of the clause cache key, analyses made against older legal codes are not reused
+        self.legal_db_version = legal_db_version
+        
         if not self.api_key or self.api_key in ['demo_key', 'demo_key_placeholder', 'your_gpt5_api_key_here']:
             raise ValueError("Please set a valid OPENAI_API_KEY in your environment variables or .env file")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Keep-alive pool of the blocking calls, the same limits as the per-loop async clients
+        self.client = OpenAI(api_key=self.api_key, http_client=httpx.Client(http2=USE_HTTP2, limits=HTTP_LIMITS))
+        
+        # Async clients and semaphores are bound to an event loop, keep one pair per loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        
+        # Cache of finished clause analyses, keyed by a hash of the prompt (clause + legal context)
+        self._cache = sqlite3.connect(os.getenv('ANALYSIS_CACHE_DB', 'analysis_cache.sqlite3'), check_same_thread=False)
+        self._cache.execute("CREATE TABLE IF NOT EXISTS analysis_cache (hash TEXT, model TEXT, json TEXT, PRIMARY KEY (hash, model))")
+        self._cache.commit()
     
     def analyze_clause(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]], clause_id: int) -> ClauseAnalysis:
         """Analyze a single T&C clause with optimized, concise prompts."""
+        prompt, relevant_laws = self._build_clause_prompt(clause_text, legal_context)
+        cache_key = hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+        
+        cached = self._get_cached_clause_analysis(cache_key, clause_text, clause_id, relevant_laws)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "Právní expert. Odpovídej pouze JSON."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2,
+                max_tokens=400,  # Reduced from 1000
+                response_format={"type": "json_object"}
+            )
+            
+            return self._parse_clause_response(response.choices[0].message.content, clause_text, clause_id, relevant_laws, cache_key)
+            
+        except Exception as e:
+            logger.error("Error in optimized GPT analysis: %s", e)
+            return self._create_fallback_analysis_object(clause_text, clause_id, str(e))
+    
+    async def analyze_clause_async(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]], clause_id: int) -> ClauseAnalysis:
+        """Analyze a single T&C clause without blocking, so many clauses can be in flight at once."""
+        prompt, relevant_laws = self._build_clause_prompt(clause_text, legal_context)
+        cache_key = hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+        
+        cached = self._get_cached_clause_analysis(cache_key, clause_text, clause_id, relevant_laws)
+        if cached is not None:
+            return cached
+        
+        client, semaphore = self._get_async_client()
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "Právní expert. Odpovídej pouze JSON."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.2,
+                    max_tokens=400,
+                    response_format={"type": "json_object"}
+                )
+            
+            return self._parse_clause_response(response.choices[0].message.content, clause_text, clause_id, relevant_laws, cache_key)
+            
+        except Exception as e:
+            logger.error("Error in optimized GPT analysis: %s", e)
+            return self._create_fallback_analysis_object(clause_text, clause_id, str(e))
+    
+    async def analyze_clauses_batch_async(self, clauses: List[str], legal_contexts: List[Dict[str, List[Dict[str, Any]]]], clause_ids: List[int]) -> List[ClauseAnalysis]:
+        """Analyze several clauses with one request, per-clause requests only when the combined answer cannot be used."""
+        analyses = [None] * len(clauses)
+        pending = []
+        for i, (clause_text, legal_context) in enumerate(zip(clauses, legal_contexts)):
+            prompt, relevant_laws = self._build_clause_prompt(clause_text, legal_context)
+            cache_key = hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+            
+            # Cached per clause under the single clause prompt, both paths share the entries
+            cached = self._get_cached_clause_analysis(cache_key, clause_text, clause_ids[i], relevant_laws)
+            if cached is not None:
+                analyses[i] = cached
+            else:
+                pending.append((i, relevant_laws, cache_key))
+        
+        if len(pending) == 1:
+            i = pending[0][0]
+            analyses[i] = await self.analyze_clause_async(clauses[i], legal_contexts[i], clause_ids[i])
+        elif pending:
+            client, semaphore = self._get_async_client()
+            try:
+                async with semaphore:
+                    response = await client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": "Právní expert. Odpovídej pouze JSON."},
+                            {"role": "user", "content": self._build_batch_prompt(clauses, legal_contexts, pending)}
+                        ],
+                        temperature=0.2,
+                        max_tokens=400 * len(pending),
+                        response_format={"type": "json_object"}
+                    )
+                results = self._parse_batch_response(response.choices[0].message.content, len(pending))
+            except Exception as e:
+                logger.error("Error in optimized GPT analysis: %s", e)
+                for i, _, _ in pending:
+                    analyses[i] = self._create_fallback_analysis_object(clauses[i], clause_ids[i], str(e))
+            else:
+                if results is None:
+                    # Malformed or incomplete answer, analyze the clauses one by one instead
+                    retried = await asyncio.gather(*[
+                        self.analyze_clause_async(clauses[i], legal_contexts[i], clause_ids[i])
+                        for i, _, _ in pending
+                    ])
+                    for (i, _, _), analysis in zip(pending, retried):
+                        analyses[i] = analysis
+                else:
+                    for (i, relevant_laws, cache_key), analysis_data in zip(pending, results):
+                        analyses[i] = self._try_build_clause_analysis(analysis_data, clauses[i], clause_ids[i], relevant_laws)
+                        if analyses[i] is None:
+                            analyses[i] = self._build_clause_analysis(self._create_fallback_analysis(clauses[i]), clauses[i], clause_ids[i], relevant_laws)
+                        else:
+                            self._store_cached_analysis(cache_key, analysis_data, clauses[i], relevant_laws)
+        
+        return analyses
+    
+    def _get_async_client(self):
+        """Return the AsyncOpenAI client and concurrency limit for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            http_client = httpx.AsyncClient(http2=USE_HTTP2, limits=HTTP_LIMITS)
+            self._async_clients[loop] = (AsyncOpenAI(api_key=self.api_key, http_client=http_client), asyncio.Semaphore(MAX_CONCURRENT_REQUESTS))
+        return self._async_clients[loop]
+    
+    def _build_clause_prompt(self, clause_text: str, legal_context: Dict[str, List[Dict[str, Any]]]):
+        """Build the concise clause prompt and the list of law references it cites."""
+        context_text, laws_text, relevant_laws = self._build_clause_context(legal_context)
+        prompt = CLAUSE_PROMPT_TEMPLATE.format(clause=clause_text, context=context_text, laws=laws_text)
+        
+        return prompt, relevant_laws
+    
+    def _build_batch_prompt(self, clauses: List[str], legal_contexts: List[Dict[str, List[Dict[str, Any]]]], pending) -> str:
+        """Build one prompt numbering the pending clauses with their legal context."""
+        items = []
+        for number, (i, _, _) in enumerate(pending, 1):
+            context_text, laws_text, _ = self._build_clause_context(legal_contexts[i])
+            items.append(BATCH_CLAUSE_TEMPLATE.format(number=number, clause=clauses[i], context=context_text, laws=laws_text))
+        
+        return BATCH_PROMPT_TEMPLATE.format(count=len(pending), clauses="\n\n".join(items))
+    
+    def _build_clause_context(self, legal_context: Dict[str, List[Dict[str, Any]]]):
+        """Select the most relevant paragraphs, return the context text, the laws text and the law references."""
         
         # Create focused legal context - only most relevant paragraphs
         relevant_laws = []
@@ -40,59 +237,131 @@ class OptimizedGPTAnalyzer:
         # Create concise, focused prompt
         context_text = " | ".join(context_snippets) if context_snippets else "Obecné právní zásady"
         
-        prompt = f"""Analyzuj klauzuli T&C podle českého práva:
-KLAUZULE: "{clause_text}"
-KONTEXT: {context_text}
-
-Odpověz JSON:
-{{"risk":"Low/Medium/High/Critical","summary":"krátké shrnutí","conflicts":["konflikty"],"explanation":"důvod rizika","laws":["{','.join(relevant_laws) if relevant_laws else 'obecné právo'}"]}}"""
+        laws_text = ','.join(relevant_laws) if relevant_laws else 'obecné právo'
         
+        return context_text, laws_text, relevant_laws
+    
+    def _parse_clause_response(self, content: str, clause_text: str, clause_id: int, relevant_laws: List[str], cache_key: str) -> ClauseAnalysis:
+        """Convert the content of a chat completion response into a ClauseAnalysis."""
+        content = content.strip()
+        
+        # Parse JSON response
+        cacheable = False
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Právní expert. Odpovídej pouze JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=400  # Reduced from 1000
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Parse JSON response
-            try:
-                analysis_data = json.loads(content)
-            except json.JSONDecodeError:
-                # Try to extract JSON
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    try:
-                        analysis_data = json.loads(json_match.group())
-                    except json.JSONDecodeError:
-                        analysis_data = self._create_fallback_analysis(clause_text)
-                else:
+            analysis_data = orjson.loads(content)
+            cacheable = True
+        except orjson.JSONDecodeError:
+            # Try to extract JSON
+            json_match = _JSON_RE.search(content)
+            if json_match:
+                try:
+                    analysis_data = orjson.loads(json_match.group())
+                except orjson.JSONDecodeError:
                     analysis_data = self._create_fallback_analysis(clause_text)
-            
-            # Validate and clean data
-            risk_level = analysis_data.get("risk", "Medium")
-            if risk_level not in ["Low", "Medium", "High", "Critical"]:
-                risk_level = "Medium"
-            
-            return ClauseAnalysis(
-                clause_id=clause_id,
-                original_text=clause_text,
-                risk_level=RiskLevel(risk_level),
-                summary=analysis_data.get("summary", "Analýza dokončena.")[:200],  # Limit length
-                legal_conflicts=analysis_data.get("conflicts", [])[:3],  # Limit to 3
-                explanation=analysis_data.get("explanation", "Standardní analýza.")[:300],  # Limit length
-                relevant_laws=analysis_data.get("laws", relevant_laws)[:3]  # Limit to 3
+            else:
+                analysis_data = self._create_fallback_analysis(clause_text)
+        
+        analysis = self._try_build_clause_analysis(analysis_data, clause_text, clause_id, relevant_laws)
+        if analysis is None:
+            return self._build_clause_analysis(self._create_fallback_analysis(clause_text), clause_text, clause_id, relevant_laws)
+        
+        # Only answers that make a valid analysis are kept, a cached bad answer would fail every later hit
+        if cacheable:
+            self._store_cached_analysis(cache_key, analysis_data, clause_text, relevant_laws)
+        return analysis
+    
+    def _parse_batch_response(self, content: str, count: int) -> Optional[List[dict]]:
+        """Return the analysis data of each clause from a batch answer, None unless there is one object per clause."""
+        try:
+            results = orjson.loads(content.strip()).get("clauses")
+        except (orjson.JSONDecodeError, AttributeError):
+            return None
+        
+        if not isinstance(results, list) or len(results) != count or not all(isinstance(item, dict) for item in results):
+            return None
+        return results
+    
+    def _build_clause_analysis(self, analysis_data: dict, clause_text: str, clause_id: int, relevant_laws: List[str]) -> ClauseAnalysis:
+        """Create a ClauseAnalysis from parsed analysis data."""
+        # Validate and clean data
+        risk_level = analysis_data.get("risk", "Medium")
+        if risk_level not in ["Low", "Medium", "High", "Critical"]:
+            risk_level = "Medium"
+        
+        return ClauseAnalysis(
+            clause_id=clause_id,
+            original_text=clause_text,
+            risk_level=RiskLevel(risk_level),
+            summary=analysis_data.get("summary", "Analýza dokončena.")[:200],  # Limit length
+            legal_conflicts=analysis_data.get("conflicts", [])[:3],  # Limit to 3
+            explanation=analysis_data.get("explanation", "Standardní analýza.")[:300],  # Limit length
+            relevant_laws=analysis_data.get("laws", relevant_laws)[:3]  # Limit to 3
+        )
+    
+    def _try_build_clause_analysis(self, analysis_data: dict, clause_text: str, clause_id: int, relevant_laws: List[str]) -> Optional[ClauseAnalysis]:
+        """Create a ClauseAnalysis from parsed analysis data, None when the data has the wrong shape, e.g. a null summary."""
+        try:
+            return self._build_clause_analysis(analysis_data, clause_text, clause_id, relevant_laws)
+        except (ValueError, TypeError, AttributeError):
+            return None
+    
+    def get_cached_analyses(self, clauses: List[str], clause_ids: List[int]) -> List[Optional[ClauseAnalysis]]:
+        """Return the stored analysis of each clause seen before in any document, None for new clauses."""
+        clause_keys = [self._clause_cache_key(clause_text) for clause_text in clauses]
+        try:
+            rows = dict(self._cache.execute(
+                f"SELECT hash, json FROM analysis_cache WHERE model = ? AND hash IN ({','.join('?' * len(clause_keys))})",
+                (self.model, *clause_keys)
+            ).fetchall())
+        except Exception as e:
+            logger.warning("Error reading analysis cache: %s", e)
+            rows = {}
+        
+        # A row that no longer makes a valid analysis counts as a miss, the clause is analyzed again
+        return [
+            self._try_build_clause_analysis(orjson.loads(rows[clause_key]), clause_text, clause_id, []) if clause_key in rows else None
+            for clause_text, clause_id, clause_key in zip(clauses, clause_ids, clause_keys)
+        ]
+    
+    def _clause_cache_key(self, clause_text: str) -> str:
+        """Cache key of a clause alone, its legal context follows from the text and the legal code version."""
+        return f"clause:{self.legal_db_version}:{text_hash(clause_text)}"
+    
+    def _get_cached_analysis(self, cache_key: str) -> Optional[dict]:
+        """Return previously stored analysis data for the same prompt, if any."""
+        try:
+            row = self._cache.execute(
+                "SELECT json FROM analysis_cache WHERE hash = ? AND model = ?",
+                (cache_key, self.model)
+            ).fetchone()
+            if row:
+                return orjson.loads(row[0])
+        except Exception as e:
+            logger.warning("Error reading analysis cache: %s", e)
+        return None
+    
+    def _get_cached_clause_analysis(self, cache_key: str, clause_text: str, clause_id: int, relevant_laws: List[str]) -> Optional[ClauseAnalysis]:
+        """Return the analysis stored for the same prompt, None when there is none or it is no longer valid."""
+        cached = self._get_cached_analysis(cache_key)
+        if cached is None:
+            return None
+        return self._try_build_clause_analysis(cached, clause_text, clause_id, relevant_laws)
+    
+    def _store_cached_analysis(self, cache_key: str, analysis_data: dict, clause_text: Optional[str] = None, relevant_laws: Optional[List[str]] = None):
+        """Store parsed analysis data for later reuse, also under the clause key when the clause is given."""
+        # A clause key hit has no legal context to take the laws from, so the ones the answer fell back to are kept
+        if relevant_laws is not None and "laws" not in analysis_data:
+            analysis_data = dict(analysis_data, laws=relevant_laws)
+        json_text = orjson.dumps(analysis_data).decode('utf-8')
+        cache_keys = [cache_key] if clause_text is None else [cache_key, self._clause_cache_key(clause_text)]
+        try:
+            self._cache.executemany(
+                "INSERT OR REPLACE INTO analysis_cache (hash, model, json) VALUES (?, ?, ?)",
+                [(key, self.model, json_text) for key in cache_keys]
             )
-            
+            self._cache.commit()
         except Exception as e:
-            print(f"Error in optimized GPT analysis: {e}")
-            return self._create_fallback_analysis_object(clause_text, clause_id, str(e))
+            logger.warning("Error writing analysis cache: %s", e)
     
     def _create_fallback_analysis(self, clause_text: str) -> dict:
         """Create fallback analysis data."""
@@ -119,28 +388,19 @@ Odpověz JSON:
     def generate_overall_summary(self, clause_analyses: List[ClauseAnalysis]) -> str:
         """Generate concise overall summary."""
         
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for analysis in clause_analyses:
-            risk_counts[analysis.risk_level.value] += 1
+        risk_counts = Counter(analysis.risk_level for analysis in clause_analyses)
         
         total = len(clause_analyses)
-        high_risk = risk_counts['High'] + risk_counts['Critical']
+        high_risk = risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL]
         
-        # Ultra-concise prompt for summary
-        prompt = f"""Shrnutí analýzy {total} klauzulí T&C:
-Vysoké riziko: {high_risk}
-Střední riziko: {risk_counts['Medium']}
-Nízké riziko: {risk_counts['Low']}
-
-Vytvoř krátké shrnutí (max 100 slov):"""
+        # Short documents get the summary straight from the counts, a GPT call would only restate them
+        if total < LLM_SUMMARY_MIN_CLAUSES:
+            return self._build_count_summary(risk_counts, total)
         
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "Právní expert. Stručné odpovědi."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._build_summary_messages(risk_counts, total),
                 temperature=0.3,
                 max_tokens=150  # Very limited for cost efficiency
             )
@@ -148,5 +408,63 @@ Vytvoř krátké shrnutí (max 100 slov):"""
             return response.choices[0].message.content.strip()[:300]  # Limit length
             
         except Exception as e:
-            print(f"Error generating summary: {e}")
-            return f"Analyzováno {total} klauzulí. Vysoké riziko: {high_risk}. Doporučuje se právní konzultace."
\ No newline at end of file
+            logger.warning("Error generating summary: %s", e)
+            return f"Analyzováno {total} klauzulí. Vysoké riziko: {high_risk}. Doporučuje se právní konzultace."
+    
+    async def generate_overall_summary_async(self, clause_analyses: List[ClauseAnalysis]) -> str:
+        """Generate concise overall summary on the pooled async client of the running loop."""
+        
+        risk_counts = Counter(analysis.risk_level for analysis in clause_analyses)
+        
+        total = len(clause_analyses)
+        high_risk = risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL]
+        
+        if total < LLM_SUMMARY_MIN_CLAUSES:
+            return self._build_count_summary(risk_counts, total)
+        
+        client, semaphore = self._get_async_client()
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_summary_messages(risk_counts, total),
+                    temperature=0.3,
+                    max_tokens=150
+                )
+            
+            return response.choices[0].message.content.strip()[:300]
+            
+        except Exception as e:
+            logger.warning("Error generating summary: %s", e)
+            return f"Analyzováno {total} klauzulí. Vysoké riziko: {high_risk}. Doporučuje se právní konzultace."
+    
+    def _build_summary_messages(self, risk_counts: Counter, total: int) -> List[Dict[str, str]]:
+        """Build the ultra-concise summary prompt from the risk counts."""
+        prompt = f"""Shrnutí analýzy {total} klauzulí T&C:
+Vysoké riziko: {risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL]}
+Střední riziko: {risk_counts[RiskLevel.MEDIUM]}
+Nízké riziko: {risk_counts[RiskLevel.LOW]}
+
+Vytvoř krátké shrnutí (max 100 slov):"""
+        
+        return [
+            {"role": "system", "content": "Právní expert. Stručné odpovědi."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _build_count_summary(self, risk_counts: Counter, total: int) -> str:
+        """Summarize the risk counts without GPT, same wording as SimpleGPTAnalyzer."""
+        if risk_counts[RiskLevel.CRITICAL] > 0:
+            summary = f"KRITICKÉ RIZIKO: Nalezeno {risk_counts[RiskLevel.CRITICAL]} kritických klauzulí z celkem {total}. "
+            summary += "Doporučujeme konzultaci s právníkem před přijetím těchto podmínek."
+        elif risk_counts[RiskLevel.HIGH] > 0:
+            summary = f"VYSOKÉ RIZIKO: Nalezeno {risk_counts[RiskLevel.HIGH]} vysoce rizikových klauzulí z celkem {total}. "
+            summary += "Podmínky obsahují ustanovení, která mohou být problematická."
+        elif risk_counts[RiskLevel.MEDIUM] > risk_counts[RiskLevel.LOW]:
+            summary = f"STŘEDNÍ RIZIKO: Většina z {total} klauzulí vyžaduje pozornost. "
+            summary += "Doporučuje se pečlivé prostudování před přijetím."
+        else:
+            summary = f"NÍZKÉ RIZIKO: Z {total} analyzovaných klauzulí většina neobsahuje zásadní problémy. "
+            summary += "Podmínky se jeví jako standardní."
+        
+        return summary
\ No newline at end of file
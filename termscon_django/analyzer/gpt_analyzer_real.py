@@ -1,9 +1,13 @@
 import os
+import re
 from openai import OpenAI
 from typing import Dict, List, Any
 from .simple_schemas import RiskLevel, ClauseAnalysis
 import json
 
+# Outermost braces of a JSON object wrapped in other text
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 class RealGPTAnalyzer:
     """Real GPT analyzer that uses OpenAI API for legal analysis."""
     
@@ -78,8 +82,7 @@ class RealGPTAnalyzer:
                 analysis_data = json.loads(content)
             except json.JSONDecodeError:
                 # If JSON parsing fails, try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
+                json_match = _JSON_RE.search(content)
                 if json_match:
                     try:
                         analysis_data = json.loads(json_match.group())
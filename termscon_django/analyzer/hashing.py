@@ -0,0 +1,15 @@
+import re
+import hashlib
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so re-submitted variants of a clause compare equal."""
+    return ' '.join(_PUNCTUATION_RE.sub(' ', text.lower()).split())
+
+
+def text_hash(text: str) -> str:
+    """Stable cache key of the normalized text, unlike hash() it survives restarts."""
+    # BLAKE2b with a 16 byte digest is several times cheaper than SHA-256 on clause sized inputs
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).hexdigest()
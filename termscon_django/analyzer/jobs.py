@@ -0,0 +1,112 @@
+import os
+import logging
+import threading
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connection, transaction, DatabaseError
+from django.utils import timezone
+
+from .models import AnalysisJob, JobState
+
+logger = logging.getLogger(__name__)
+
+# Analyses run at once by this process, the request threads only enqueue and poll
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))
+
+# Queued or running jobs without a heartbeat this long were lost with the process that ran them, e.g. on a restart
+STALE_JOB_AFTER = timedelta(seconds=int(os.getenv('ANALYSIS_JOB_TIMEOUT', '600')))
+
+_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix='analysis-worker')
+
+# Jobs queued or running in this process, kept fresh by the heartbeat of its running analyses
+_owned_jobs = set()
+_owned_jobs_lock = threading.Lock()
+
+
+def submit_analysis(text_content: str, filename: str = None) -> AnalysisJob:
+    """Queue a document for the background worker and return its job."""
+    job = AnalysisJob.objects.create(original_filename=filename)
+
+    def enqueue():
+        with _owned_jobs_lock:
+            _owned_jobs.add(job.id)
+        _executor.submit(_run_analysis, job.id, text_content, filename)
+
+    # Inside a transaction the worker could poll before the job row is visible to it
+    transaction.on_commit(enqueue)
+    return job
+
+
+def _run_analysis(job_id, text_content: str, filename: str):
+    """Analyze a queued document and record the outcome on its job."""
+    stop_heartbeat = threading.Event()
+    try:
+        # A job already failed as stale while it waited is not analyzed anymore
+        if not _update_job(job_id, JobState.QUEUED, state=JobState.RUNNING):
+            return
+        threading.Thread(target=_heartbeat, args=(stop_heartbeat,), name='analysis-heartbeat', daemon=True).start()
+        result = apps.get_app_config('analyzer').terms_analyzer.analyze_text(text_content, filename)
+        # orjson encodes the result dataclasses and their enums natively, no intermediate dict is built
+        _update_job(job_id, JobState.RUNNING, state=JobState.DONE, result=orjson.dumps(result).decode('utf-8'))
+    except Exception as e:
+        logger.error("Analysis job %s failed: %s", job_id, e)
+        _update_job(job_id, JobState.RUNNING, state=JobState.FAILED, error=str(e))
+    finally:
+        stop_heartbeat.set()
+        with _owned_jobs_lock:
+            _owned_jobs.discard(job_id)
+        # Worker threads outlive requests, so Django never closes their connection for them
+        connection.close()
+
+
+def _heartbeat(stop: threading.Event):
+    """Touch every job of this process while an analysis runs, jobs waiting behind it included."""
+    try:
+        while not stop.wait(STALE_JOB_AFTER.total_seconds() / 4):
+            with _owned_jobs_lock:
+                job_ids = list(_owned_jobs)
+            try:
+                AnalysisJob.objects.filter(
+                    id__in=job_ids, state__in=[JobState.QUEUED, JobState.RUNNING]
+                ).update(updated_at=timezone.now())
+            except DatabaseError as e:
+                logger.warning("Could not record analysis job heartbeat: %s", e)
+    finally:
+        connection.close()
+
+
+def fail_stale_jobs(job_id=None) -> int:
+    """Mark jobs lost with a previous worker process as failed, so their clients stop polling."""
+    jobs = AnalysisJob.objects.filter(
+        state__in=[JobState.QUEUED, JobState.RUNNING],
+        updated_at__lt=timezone.now() - STALE_JOB_AFTER
+    )
+    if job_id is not None:
+        jobs = jobs.filter(id=job_id)
+    # Live processes keep touching their jobs, only those without a heartbeat past the timeout are failed
+    return jobs.update(
+        state=JobState.FAILED,
+        error='Analysis was interrupted, please submit the document again',
+        updated_at=timezone.now()
+    )
+
+
+def fail_stale_jobs_on_startup():
+    """Fail the jobs a previous run left behind, a not yet migrated database is skipped."""
+    try:
+        count = fail_stale_jobs()
+    except DatabaseError as e:
+        logger.warning("Could not check for interrupted analysis jobs: %s", e)
+    else:
+        if count:
+            logger.warning("Marked %d interrupted analysis jobs as failed", count)
+    finally:
+        connection.close()
+
+
+def _update_job(job_id, from_state, **fields) -> int:
+    # Only from the expected state, so a job failed as stale is never revived; a queryset update skips auto_now
+    return AnalysisJob.objects.filter(id=job_id, state=from_state).update(updated_at=timezone.now(), **fields)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clauseanalysisresult',
+            index=models.Index(fields=['session', 'clause_id'], name='analyzer_clause_session_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 import uuid
 
 # Create your models here.
@@ -38,3 +38,46 @@ class ClauseAnalysisResult(models.Model):
 
     class Meta:
         ordering = ['clause_id']
+        indexes = [
+            models.Index(fields=['session', 'clause_id'], name='analyzer_clause_session_idx'),
+        ]
+
+    @classmethod
+    def persist_many(cls, session, analyses):
+        """Store the clause analyses of a session with batched INSERTs in one transaction"""
+        rows = [
+            cls(
+                session=session,
+                clause_id=analysis.clause_id,
+                original_text=analysis.original_text,
+                risk_level=analysis.risk_level.value,
+                summary=analysis.summary,
+                legal_conflicts=analysis.legal_conflicts,
+                explanation=analysis.explanation,
+                relevant_laws=analysis.relevant_laws
+            )
+            for analysis in analyses
+        ]
+        # Inside the caller's transaction no savepoint is needed, a failed batch rolls back the whole session
+        with transaction.atomic(savepoint=False):
+            return cls.objects.bulk_create(rows, batch_size=500)
+
+
+class JobState(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+class AnalysisJob(models.Model):
+    """Track a document analysis run by the background worker, polled by the client"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    state = models.CharField(max_length=10, choices=JobState.choices, default=JobState.QUEUED)
+    original_filename = models.CharField(max_length=255, blank=True, null=True)
+    result = models.TextField(blank=True, null=True)  # Analysis response once done, already encoded as JSON
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-created_at']
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 from enum import Enum
 
@@ -8,7 +8,11 @@ class RiskLevel(str, Enum):
     HIGH = "High"
     CRITICAL = "Critical"
 
-class ClauseAnalysis(BaseModel):
+class FrozenModel(BaseModel):
+    """Immutable model base, results are never modified after construction."""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+class ClauseAnalysis(FrozenModel):
     clause_id: int
     original_text: str
     risk_level: RiskLevel
@@ -17,7 +21,7 @@ class ClauseAnalysis(BaseModel):
     explanation: str
     relevant_laws: List[str]
 
-class OverallSummary(BaseModel):
+class OverallSummary(FrozenModel):
     overall_risk_score: RiskLevel
     total_clauses: int
     high_risk_count: int
@@ -25,11 +29,11 @@ class OverallSummary(BaseModel):
     low_risk_count: int
     overview: str
 
-class AnalysisResult(BaseModel):
+class AnalysisResult(FrozenModel):
     document_id: str
     overall_summary: OverallSummary
     clause_analyses: List[ClauseAnalysis]
 
-class DocumentUpload(BaseModel):
+class DocumentUpload(FrozenModel):
     content: str
     filename: Optional[str] = None
\ No newline at end of file
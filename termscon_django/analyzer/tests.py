@@ -1,3 +1,108 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .apps import AnalyzerConfig
+from .models import AnalysisJob, JobState
+from . import jobs
+from .jobs import fail_stale_jobs
+from .simple_schemas import AnalysisResult, OverallSummary, ClauseAnalysis, RiskLevel
+
+
+def make_result(text_content, filename=None):
+    """Analysis result of a one clause document, as TermsAnalyzer.analyze_text returns it."""
+    clause = ClauseAnalysis(1, text_content, RiskLevel.HIGH, 'shrnutí', ['konflikt'], 'vysvětlení', ['§1815 Občanského zákoníku'])
+    summary = OverallSummary(RiskLevel.HIGH, 1, 1, 0, 0, 'přehled')
+    return AnalysisResult('doc-1', summary, [clause])
+
+
+# The worker runs on its own thread, so the job row must be committed rather than kept in a test transaction
+class AnalysisJobTests(TransactionTestCase):
+
+    def setUp(self):
+        self.analyzer = mock.Mock()
+        patcher = mock.patch.object(AnalyzerConfig, 'terms_analyzer', new_callable=mock.PropertyMock, return_value=self.analyzer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, text_content):
+        response = self.client.post(reverse('termscon_django.analyzer:analyze'), {'text_content': text_content})
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def poll(self, status_url):
+        """Poll a job like the page does until it is done or failed."""
+        for _ in range(100):
+            data = self.client.get(status_url).json()
+            if data['state'] in (JobState.DONE, JobState.FAILED):
+                return data
+            time.sleep(0.05)
+        self.fail('Analysis job did not finish')
+
+    def test_submitted_job_is_done_with_result(self):
+        self.analyzer.analyze_text.side_effect = make_result
+
+        job = self.submit('Smlouvu lze kdykoli vypovědět.')
+        self.assertEqual(job['state'], JobState.QUEUED)
+
+        data = self.poll(job['status_url'])
+        self.assertEqual(data['state'], JobState.DONE)
+        self.assertEqual(data['job_id'], job['job_id'])
+        self.assertEqual(data['result']['overall_summary']['overall_risk_score'], 'High')
+        self.assertEqual(data['result']['clause_analyses'][0]['original_text'], 'Smlouvu lze kdykoli vypovědět.')
+        self.analyzer.analyze_text.assert_called_once_with('Smlouvu lze kdykoli vypovědět.', 'pasted_text.txt')
+
+    def test_failed_analysis_reports_error(self):
+        self.analyzer.analyze_text.side_effect = ValueError('Could not segment document into clauses')
+
+        data = self.poll(self.submit('x')['status_url'])
+        self.assertEqual(data['state'], JobState.FAILED)
+        self.assertIn('Could not segment document into clauses', data['error'])
+        self.assertNotIn('result', data)
+
+    def test_stale_jobs_are_failed(self):
+        stale = AnalysisJob.objects.create(state=JobState.RUNNING)
+        fresh = AnalysisJob.objects.create(state=JobState.QUEUED)
+        AnalysisJob.objects.filter(id=stale.id).update(updated_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(fail_stale_jobs(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.state, JobState.FAILED)
+        self.assertEqual(fresh.state, JobState.QUEUED)
+
+    def test_polling_fails_stale_job(self):
+        job = AnalysisJob.objects.create(state=JobState.QUEUED)
+        AnalysisJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(days=1))
+
+        data = self.client.get(reverse('termscon_django.analyzer:job', args=[job.id])).json()
+        self.assertEqual(data['state'], JobState.FAILED)
+
+    def test_jobs_outliving_the_timeout_are_not_failed(self):
+        def slow_analysis(text_content, filename=None):
+            time.sleep(1)
+            return make_result(text_content, filename)
+        self.analyzer.analyze_text.side_effect = slow_analysis
+
+        # One job more than there are workers, the last one waits queued past the timeout too
+        with mock.patch.object(jobs, 'STALE_JOB_AFTER', timedelta(seconds=0.4)):
+            submitted = [self.submit(f'Klauzule {i}') for i in range(jobs.ANALYSIS_WORKERS + 1)]
+            for job in submitted:
+                self.assertEqual(self.poll(job['status_url'])['state'], JobState.DONE)
+
+    def test_stale_job_is_not_revived_by_its_worker(self):
+        job = AnalysisJob.objects.create(state=JobState.RUNNING)
+        AnalysisJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(days=1))
+        fail_stale_jobs()
+
+        jobs._update_job(job.id, JobState.RUNNING, state=JobState.DONE, result='{}')
+        job.refresh_from_db()
+        self.assertEqual(job.state, JobState.FAILED)
+
+    def test_unknown_job_is_not_found(self):
+        response = self.client.get(reverse('termscon_django.analyzer:job', args=['00000000-0000-0000-0000-000000000000']))
+        self.assertEqual(response.status_code, 404)
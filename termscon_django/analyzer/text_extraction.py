@@ -3,14 +3,22 @@ from typing import Union
 import PyPDF2
 from docx import Document
 
+# PyMuPDF parses PDFs in C, fallback to PyPDF2 if not installed
+try:
+    import pymupdf
+    USE_PYMUPDF = True
+except ImportError:
+    USE_PYMUPDF = False
+
 def extract_text_from_pdf(file_content: bytes) -> str:
     """Extract text from PDF file content."""
     try:
+        if USE_PYMUPDF:
+            with pymupdf.open(stream=file_content, filetype='pdf') as doc:
+                return "\n".join(page.get_text() for page in doc).strip()
+        
         pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        return "\n".join(page.extract_text() or "" for page in pdf_reader.pages).strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
 
@@ -18,10 +26,7 @@ def extract_text_from_docx(file_content: bytes) -> str:
     """Extract text from DOCX file content."""
     try:
         doc = Document(io.BytesIO(file_content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from DOCX: {str(e)}")
 
@@ -1,20 +1,243 @@
 import sqlite3
+import functools
+import importlib.util
+import logging
+import threading
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 import os
+from pathlib import Path
+from django.core.cache import cache
+from .hashing import text_hash
+
+logger = logging.getLogger(__name__)
+
+# SimSIMD scores int8 vectors with native SIMD kernels, keep float32 for NumPy if not installed
+try:
+    import simsimd as simd
+    USE_SIMSIMD = True
+except ImportError:
+    USE_SIMSIMD = False
+
+# FAISS searches large codes through an HNSW graph instead of scoring every paragraph, exact scan if not installed
+try:
+    import faiss
+    USE_FAISS = True
+except ImportError:
+    USE_FAISS = False
+
+# Codes with fewer paragraphs are scanned exactly, below this an HNSW graph costs recall without saving time
+HNSW_MIN_ROWS = int(os.getenv('HNSW_MIN_ROWS', 50000))
+
+# Paragraphs less similar than this are not relevant enough to include
+MIN_SIMILARITY = 0.3
+
+# Context returned when a code cannot be searched, built once and shared by every miss
+_FALLBACK_CIVIL_CONTEXT = (
+    {
+        'text': '§1815 Občanského zákoníku: Smlouva je neplatná, pokud odporuje zákonu nebo dobrým mravům.',
+        'metadata': {'paragraph': '1815'},
+        'similarity': 0.5
+    },
+    {
+        'text': '§1826 Občanského zákoníku: Podmínky smlouvy musí být spravedlivé pro obě strany.',
+        'metadata': {'paragraph': '1826'},
+        'similarity': 0.5
+    }
+)
+_FALLBACK_CRIMINAL_CONTEXT = (
+    {
+        'paragraph_number': '1',
+        'text': '§1 Trestního zákoníku: Čin je trestný, jen pokud jeho trestnost byla zákonem stanovena dříve.',
+        'similarity': 0.5
+    },
+)
+
+# ONNX Runtime runs the int8-quantized export of the query model, keep PyTorch fp32 if not installed;
+# only looked up here, importing optimum would load transformers at startup
+USE_ONNX = importlib.util.find_spec('onnxruntime') is not None and importlib.util.find_spec('optimum') is not None
+
+# Quantized export to load, the VNNI variant uses int8 dot product instructions on recent x86 CPUs
+ONNX_MODEL_FILE = os.getenv('EMBEDDING_ONNX_FILE', 'onnx/model_qint8_avx512_vnni.onnx')
+
+# Query embedding model, loaded once on first use and shared by all instances
+_MODEL_NAME = 'all-MiniLM-L6-v2'
+_MODEL_VARIANT = f"{_MODEL_NAME}:{ONNX_MODEL_FILE}" if USE_ONNX else _MODEL_NAME
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+def _get_model():
+    """Return the shared SentenceTransformer, loading it on first use."""
+    global _MODEL
+    if _MODEL is None:
+        # The warm-up thread and the first requests may ask at once, only one of them loads the model
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                from sentence_transformers import SentenceTransformer
+                if USE_ONNX:
+                    _MODEL = SentenceTransformer(_MODEL_NAME, backend='onnx', model_kwargs={'file_name': ONNX_MODEL_FILE})
+                else:
+                    _MODEL = SentenceTransformer(_MODEL_NAME)
+    return _MODEL
+
+def _quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Scale each vector so its largest component maps to 127, cosine similarity ignores the scale."""
+    # Reductions and one in-place rounded buffer, a full matrix is never copied more than once
+    max_abs = np.maximum(vectors.max(axis=-1, keepdims=True), -vectors.min(axis=-1, keepdims=True))
+    scales = np.divide(127, max_abs, out=np.ones_like(max_abs), where=max_abs > 0)
+    scaled = vectors * scales
+    np.rint(scaled, out=scaled)
+    return scaled.astype(np.int8)
+
+def _query_key(text: str) -> str:
+    """Cache key of a query, the uncased model embeds case and whitespace variants identically."""
+    return ' '.join(text.lower().split())
+
+def _cache_key(key: str) -> str:
+    """Django cache key of a normalized query, vectors of the quantized and the fp32 model are kept apart."""
+    return f"query-embedding:{_MODEL_VARIANT}:{text_hash(key)}"
+
+@functools.lru_cache(maxsize=4096)
+def _encode_cached(key: str) -> bytes:
+    """Encode a query to unit length, repeated clauses reuse the cached vector (bytes keep it immutable)."""
+    # Behind the per-process LRU, Django's cache shares vectors between workers when a shared backend is configured
+    cache_key = _cache_key(key)
+    vector = cache.get(cache_key)
+    if vector is None:
+        vector = _get_model().encode([key], normalize_embeddings=True)[0].astype(np.float32).tobytes()
+        cache.set(cache_key, vector, timeout=None)
+    return vector
+
+def _encode_many(keys: List[str]) -> np.ndarray:
+    """Encode several queries to unit length, running the model once over those not cached yet."""
+    cache_keys = {key: _cache_key(key) for key in keys}
+    vectors = cache.get_many(list(cache_keys.values()))
+    
+    # One batched forward pass amortizes tokenization and model overhead over all new clauses
+    missing = [key for key, cache_key in cache_keys.items() if cache_key not in vectors]
+    if missing:
+        encoded = _get_model().encode(missing, batch_size=32, normalize_embeddings=True, convert_to_numpy=True)
+        new_vectors = {cache_keys[key]: vector.astype(np.float32).tobytes() for key, vector in zip(missing, encoded)}
+        cache.set_many(new_vectors, timeout=None)
+        vectors.update(new_vectors)
+    
+    return np.vstack([np.frombuffer(vectors[cache_keys[key]], dtype=np.float32) for key in keys])
 
 class RealVectorDB:
     """Real vector database interface that actually uses the embedded legal codes."""
     
+    __slots__ = (
+        'chroma_db_path', 'criminal_db_path',
+        '_civil_mat', '_civil_docs', '_civil_meta',
+        '_criminal_mat', '_criminal_docs', '_criminal_numbers',
+        '_civil_index', '_criminal_index',
+        '_civil_load_failed', '_criminal_load_failed', '_load_lock'
+    )
+    
+    # Query embedding used when the model cannot be loaded, matches nothing so the fallback context is returned
+    _ZERO_EMB = np.zeros(384, dtype=np.float32)
+    
     def __init__(self, chroma_db_path: str, criminal_db_path: str):
         self.chroma_db_path = chroma_db_path
         self.criminal_db_path = criminal_db_path
-        self.civil_embeddings = None
-        self.criminal_embeddings = None
         
+        # Unit-length embedding matrix, paragraph texts and metadata (paragraph numbers) of each code, loaded on first search
+        self._civil_mat = self._civil_docs = self._civil_meta = None
+        self._criminal_mat = self._criminal_docs = self._criminal_numbers = None
+        
+        # HNSW graph of a code large enough to need one, searched instead of its matrix when present
+        self._civil_index = self._criminal_index = None
+        
+        # A failed load is not retried for every clause
+        self._civil_load_failed = False
+        self._criminal_load_failed = False
+        
+        # Searches run on worker threads, only the lazy load needs guarding since the loaded data is read-only
+        self._load_lock = threading.Lock()
+    
+    def _cache_paths(self, source_path: str):
+        """Paths of the cached matrix and texts of a code, the matrix in the layout it is searched in."""
+        base_path = os.path.splitext(source_path)[0]
+        return base_path + ('_i8' if USE_SIMSIMD else '') + '_embeddings.npy', base_path + '_documents.json'
+    
+    def _read_cache(self, source_path: str, source_mtime: float):
+        """Return (documents, matrix, metadatas) from the cache of a code, None when missing or older than the source."""
+        matrix_path, documents_path = self._cache_paths(source_path)
+        
+        # One stat per file, a missing file simply means there is no usable cache
+        try:
+            if min(os.path.getmtime(matrix_path), os.path.getmtime(documents_path)) < source_mtime:
+                return None
+        except OSError:
+            return None
+        
+        try:
+            with open(documents_path, encoding='utf-8') as f:
+                cached = json.load(f)
+            
+            # Read-only mapping, the OS page cache keeps the hot pages and shares them between worker processes
+            return cached['documents'], np.load(matrix_path, mmap_mode='r'), cached['metadatas']
+        except Exception as e:
+            logger.warning("Error reading embedding cache of %s: %s", source_path, e)
+            return None
+    
+    def _write_cache(self, source_path: str, documents, matrix: np.ndarray, metadatas):
+        """Save the normalized matrix and texts of a code so later startups skip the source database."""
+        matrix_path, documents_path = self._cache_paths(source_path)
+        try:
+            np.save(matrix_path, matrix)
+            with open(documents_path, 'w', encoding='utf-8') as f:
+                json.dump({'documents': documents, 'metadatas': metadatas}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning("Error writing embedding cache of %s: %s", source_path, e)
+    
+    def _load_hnsw_index(self, source_path: str, matrix: np.ndarray):
+        """Load the HNSW graph of a large code, building and saving it when missing or older than the source."""
+        if not USE_FAISS or len(matrix) < HNSW_MIN_ROWS:
+            return None
+        
+        index_path = os.path.splitext(source_path)[0] + '_hnsw.faiss'
+        try:
+            if os.path.getmtime(index_path) >= os.path.getmtime(source_path):
+                index = faiss.read_index(index_path)
+                if index.ntotal == len(matrix):
+                    return index
+        except (OSError, RuntimeError):
+            pass
+        
+        try:
+            # Inner product of unit vectors is the cosine similarity, int8 rows are scaled back to unit length
+            vectors = np.array(matrix, dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            index.add(vectors)
+            index.hnsw.efSearch = 64
+            faiss.write_index(index, index_path)
+            return index
+        except (OSError, RuntimeError) as e:
+            logger.warning("Error building HNSW index of %s: %s", source_path, e)
+            return None
+    
     def _load_civil_code_embeddings(self):
-        """Load Civil Code embeddings from ChromaDB."""
+        """Load Civil Code embeddings, from the memory-mapped cache when it is newer than ChromaDB."""
+        # Without the ChromaDB file there is nothing to load, PersistentClient would only create an empty store
+        try:
+            chroma_mtime = os.path.getmtime(self.chroma_db_path)
+        except OSError as e:
+            logger.warning("Error loading Civil Code embeddings: %s", e)
+            return False
+        
+        cached = self._read_cache(self.chroma_db_path, chroma_mtime)
+        if cached is not None:
+            # The matrix is set last, a search on another thread only reads the texts once it is there
+            documents, matrix, metadatas = cached
+            self._civil_docs = documents
+            self._civil_meta = metadatas or [{} for _ in documents]
+            self._civil_mat = matrix
+            return True
+        
         try:
             import chromadb
             # Connect to the existing ChromaDB
@@ -24,162 +247,263 @@ class RealVectorDB:
             # Get all documents and embeddings
             results = collection.get(include=['documents', 'embeddings', 'metadatas'])
             
-            self.civil_embeddings = {
-                'documents': results['documents'],
-                'embeddings': np.array(results['embeddings']) if results['embeddings'] else None,
-                'metadatas': results['metadatas']
-            }
+            # Lists of Python floats would become float64, convert straight to one contiguous float32 block;
+            # newer ChromaDB returns an ndarray whose truth value is ambiguous, so test the length
+            embeddings = np.asarray(results['embeddings'], dtype=np.float32, order='C')
+            
+            # Only the unit-length embeddings are kept, the raw vectors are not needed for cosine similarity
+            self._civil_docs = results['documents']
+            self._civil_meta = results['metadatas'] or [{} for _ in results['documents']]
+            self._civil_mat = self._normalize_rows(embeddings) if len(embeddings) else None
+            
+            # Save the normalized matrix so later startups skip ChromaDB
+            if self._civil_mat is not None:
+                self._write_cache(self.chroma_db_path, self._civil_docs, self._civil_mat, self._civil_meta)
             return True
         except Exception as e:
-            print(f"Error loading Civil Code embeddings: {e}")
+            logger.warning("Error loading Civil Code embeddings: %s", e)
             return False
     
     def _load_criminal_code_embeddings(self):
-        """Load Criminal Code embeddings from SQLite."""
+        """Load Criminal Code embeddings, from the memory-mapped cache when it is newer than the SQLite database."""
+        try:
+            criminal_mtime = os.path.getmtime(self.criminal_db_path)
+        except OSError as e:
+            logger.warning("Error loading Criminal Code embeddings: %s", e)
+            return False
+        
+        cached = self._read_cache(self.criminal_db_path, criminal_mtime)
+        if cached is not None:
+            # The matrix is set last, a search on another thread only reads the texts once it is there
+            documents, matrix, metadatas = cached
+            self._criminal_docs = documents
+            self._criminal_numbers = [metadata['paragraph_number'] for metadata in metadatas]
+            self._criminal_mat = matrix
+            return True
+        
         try:
-            conn = sqlite3.connect(self.criminal_db_path)
+            # Read-only open fails on a missing file instead of creating an empty database there
+            conn = sqlite3.connect(Path(self.criminal_db_path).absolute().as_uri() + '?mode=ro', uri=True)
             cursor = conn.cursor()
             
-            # Get all paragraphs with embeddings
-            cursor.execute("SELECT paragraph_number, text, embedding FROM paragraphs WHERE embedding IS NOT NULL")
-            rows = cursor.fetchall()
+            # Size the matrix up front: number of paragraphs with embeddings and their dimension
+            count, dim = cursor.execute(
+                "SELECT COUNT(*), MAX(length(embedding)) / 4 FROM embeddings WHERE length(embedding) > 0"
+            ).fetchone()
             
             documents = []
-            embeddings = []
-            metadatas = []
+            numbers = []
+            embeddings = np.empty((count, dim), dtype=np.float32) if count else None
             
-            for row in rows:
-                paragraph_number, text, embedding_blob = row
-                if embedding_blob:
-                    # Convert blob to numpy array
-                    embedding = np.frombuffer(embedding_blob, dtype=np.float32)
-                    
-                    documents.append(text)
-                    embeddings.append(embedding)
-                    metadatas.append({'paragraph_number': paragraph_number})
+            # Stream all paragraphs with embeddings straight into the preallocated matrix
+            cursor.arraysize = 1000
+            cursor.execute(
+                """
+                SELECT p.cislo, p.text, e.embedding
+                FROM embeddings AS e
+                JOIN paragrafy AS p ON p.id = e.paragraf_id
+                WHERE length(e.embedding) > 0
+                ORDER BY e.paragraf_id
+                """
+            )
+            i = 0
+            while True:
+                batch = cursor.fetchmany()
+                if not batch:
+                    break
+                
+                # One joined buffer per batch, copied into the matrix rows in a single NumPy assignment
+                embeddings[i:i + len(batch)] = np.frombuffer(b''.join(row[2] for row in batch), dtype=np.float32).reshape(len(batch), dim)
+                documents.extend(row[1] for row in batch)
+                numbers.extend(row[0] for row in batch)
+                i += len(batch)
             
-            self.criminal_embeddings = {
-                'documents': documents,
-                'embeddings': np.array(embeddings) if embeddings else None,
-                'metadatas': metadatas
-            }
+            if embeddings is not None:
+                embeddings = embeddings[:i]
+            
+            self._criminal_docs = documents
+            self._criminal_numbers = numbers
+            self._criminal_mat = self._normalize_rows(embeddings) if embeddings is not None else None
             
             conn.close()
+            
+            # Save the normalized matrix so later startups and other workers skip the SQLite read
+            if self._criminal_mat is not None:
+                self._write_cache(self.criminal_db_path, documents, self._criminal_mat, [{'paragraph_number': number} for number in numbers])
             return True
         except Exception as e:
-            print(f"Error loading Criminal Code embeddings: {e}")
+            logger.warning("Error loading Criminal Code embeddings: %s", e)
             return False
     
     def _create_query_embedding(self, query_text: str) -> np.ndarray:
         """Create embedding for query text using a simple method."""
         # For now, use a simple approach - in production, use same model as original embeddings
         try:
-            from sentence_transformers import SentenceTransformer
-            model = SentenceTransformer('all-MiniLM-L6-v2')
-            return model.encode([query_text])[0]
-        except:
-            # Fallback: create a dummy embedding for testing
-            return np.random.random(384).astype(np.float32)
-    
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors."""
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-    
-    def search_civil_code(self, query_text: str, n_results: int = 3) -> List[Dict[str, Any]]:
-        """Search Civil Code embeddings for relevant paragraphs."""
-        if not self.civil_embeddings:
-            if not self._load_civil_code_embeddings():
-                return self._fallback_civil_context()
+            return np.frombuffer(_encode_cached(_query_key(query_text)), dtype=np.float32)
+        except (ImportError, OSError) as e:
+            logger.warning("Error creating query embedding: %s", e)
+            return self._ZERO_EMB
+    
+    def _create_query_embeddings(self, query_texts: List[str]) -> np.ndarray:
+        """Create embeddings for several query texts, one row per text."""
+        if not query_texts:
+            return np.empty((0, len(self._ZERO_EMB)), dtype=np.float32)
+        try:
+            return _encode_many([_query_key(query_text) for query_text in query_texts])
+        except (ImportError, OSError) as e:
+            logger.warning("Error creating query embeddings: %s", e)
+            return np.broadcast_to(self._ZERO_EMB, (len(query_texts), len(self._ZERO_EMB)))
+    
+    def _normalize_rows(self, embeddings) -> np.ndarray:
+        """Scale each embedding to unit length once, so a dot product gives the cosine similarity."""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
         
-        if self.civil_embeddings['embeddings'] is None:
-            return self._fallback_civil_context()
+        # int8 quarters the bytes scanned per query, NumPy has no fast int8 cosine so only with SimSIMD
+        return _quantize_int8(matrix) if USE_SIMSIMD else matrix
+    
+    def _rank_by_similarity(self, normalized: np.ndarray, query_embeddings: np.ndarray, n_results: int, index=None):
+        """Return (similarity, index) pairs of the n most similar relevant rows for each query, computed with one matrix product."""
+        # Query embeddings are already unit length, normalized once when encoded rather than once per code searched
+        queries = np.asarray(query_embeddings, dtype=np.float32)
         
-        # Create query embedding
-        query_embedding = self._create_query_embedding(query_text)
+        # A code embedded by a different model than the queries cannot be compared, the caller falls back
+        if queries.shape[1] != normalized.shape[1]:
+            return [[] for _ in queries]
+        if index is not None:
+            # All queries walk the graph in one call, missing neighbours come back as -1
+            top_similarities, top = index.search(np.ascontiguousarray(queries), n_results)
+            return [
+                [(similarity, idx) for similarity, idx in zip(row_similarities, row) if idx >= 0 and similarity > MIN_SIMILARITY]
+                for row_similarities, row in zip(top_similarities.tolist(), top.tolist())
+            ]
+        if normalized.dtype == np.int8:
+            # SimSIMD's int8 kernel returns cosine distance, the queries are quantized like the rows
+            similarities = 1 - np.asarray(simd.cdist(_quantize_int8(queries), normalized, metric='cosine'))
+        else:
+            similarities = queries @ normalized.T
         
-        # Calculate similarities
-        similarities = []
-        for i, doc_embedding in enumerate(self.civil_embeddings['embeddings']):
-            similarity = self._cosine_similarity(query_embedding, doc_embedding)
-            similarities.append((similarity, i))
-        
-        # Sort by similarity and get top results
-        similarities.sort(reverse=True)
-        
-        results = []
-        for similarity, idx in similarities[:n_results]:
-            if similarity > 0.3:  # Only include relevant results
-                results.append({
-                    'text': self.civil_embeddings['documents'][idx],
-                    'metadata': self.civil_embeddings['metadatas'][idx] if self.civil_embeddings['metadatas'] else {},
-                    'similarity': similarity
-                })
+        n_results = min(n_results, similarities.shape[1])
+        if n_results <= 0:
+            return [[] for _ in queries]
+        # Partition for the largest n directly, negating would copy the whole similarity matrix
+        top = np.argpartition(similarities, -n_results, axis=1)[:, -n_results:]
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(top_similarities, axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        top_similarities = np.take_along_axis(top_similarities, order, axis=1)
         
-        return results if results else self._fallback_civil_context()
+        return [
+            [(similarity, idx) for similarity, idx in zip(row_similarities, row) if similarity > MIN_SIMILARITY]
+            for row_similarities, row in zip(top_similarities.tolist(), top.tolist())
+        ]
     
-    def search_criminal_code(self, query_text: str, n_results: int = 2) -> List[Dict[str, Any]]:
-        """Search Criminal Code embeddings for relevant paragraphs."""
-        if not self.criminal_embeddings:
-            if not self._load_criminal_code_embeddings():
-                return self._fallback_criminal_context()
-        
-        if self.criminal_embeddings['embeddings'] is None:
-            return self._fallback_criminal_context()
-        
-        # Create query embedding  
-        query_embedding = self._create_query_embedding(query_text)
+    def search_civil_code(self, query_text: str, n_results: int = 3, query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Search Civil Code embeddings for relevant paragraphs."""
+        # Create query embedding unless the caller already has one
+        if query_embedding is None:
+            query_embedding = self._create_query_embedding(query_text)
+        return self.search_civil_code_batch(query_embedding[None, :], n_results)[0]
+    
+    def search_civil_code_batch(self, query_embeddings: np.ndarray, n_results: int = 3) -> List[List[Dict[str, Any]]]:
+        """Search Civil Code embeddings for relevant paragraphs of several queries at once."""
+        # Loaded matrix is the fast path, a failed or empty load is never retried
+        if self._civil_mat is None:
+            with self._load_lock:
+                if self._civil_mat is None and not self._civil_load_failed:
+                    self._civil_load_failed = not self._load_civil_code_embeddings() or self._civil_mat is None
+                    if not self._civil_load_failed:
+                        # Until the graph is there, concurrent searches scan the matrix
+                        self._civil_index = self._load_hnsw_index(self.chroma_db_path, self._civil_mat)
+            if self._civil_load_failed:
+                return [self._fallback_civil_context() for _ in query_embeddings]
         
-        # Calculate similarities
-        similarities = []
-        for i, doc_embedding in enumerate(self.criminal_embeddings['embeddings']):
-            similarity = self._cosine_similarity(query_embedding, doc_embedding)
-            similarities.append((similarity, i))
-        
-        # Sort by similarity and get top results
-        similarities.sort(reverse=True)
-        
-        results = []
-        for similarity, idx in similarities[:n_results]:
-            if similarity > 0.3:  # Only include relevant results
-                results.append({
-                    'text': self.criminal_embeddings['documents'][idx],
-                    'paragraph_number': self.criminal_embeddings['metadatas'][idx]['paragraph_number'],
+        # Calculate similarities against all paragraphs at once and get top relevant results
+        return [
+            [
+                {
+                    'text': self._civil_docs[idx],
+                    'metadata': self._civil_meta[idx],
                     'similarity': similarity
-                })
+                }
+                for similarity, idx in ranked
+            ] or self._fallback_civil_context()
+            for ranked in self._rank_by_similarity(self._civil_mat, query_embeddings, n_results, self._civil_index)
+        ]
+    
+    def search_criminal_code(self, query_text: str, n_results: int = 2, query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Search Criminal Code embeddings for relevant paragraphs."""
+        # Create query embedding unless the caller already has one
+        if query_embedding is None:
+            query_embedding = self._create_query_embedding(query_text)
+        return self.search_criminal_code_batch(query_embedding[None, :], n_results)[0]
+    
+    def search_criminal_code_batch(self, query_embeddings: np.ndarray, n_results: int = 2) -> List[List[Dict[str, Any]]]:
+        """Search Criminal Code embeddings for relevant paragraphs of several queries at once."""
+        # Loaded matrix is the fast path, a failed or empty load is never retried
+        if self._criminal_mat is None:
+            with self._load_lock:
+                if self._criminal_mat is None and not self._criminal_load_failed:
+                    self._criminal_load_failed = not self._load_criminal_code_embeddings() or self._criminal_mat is None
+                    if not self._criminal_load_failed:
+                        # Until the graph is there, concurrent searches scan the matrix
+                        self._criminal_index = self._load_hnsw_index(self.criminal_db_path, self._criminal_mat)
+            if self._criminal_load_failed:
+                return [self._fallback_criminal_context() for _ in query_embeddings]
         
-        return results if results else self._fallback_criminal_context()
+        # Calculate similarities against all paragraphs at once and get top relevant results
+        return [
+            [
+                {
+                    'text': self._criminal_docs[idx],
+                    'paragraph_number': self._criminal_numbers[idx],
+                    'similarity': similarity
+                }
+                for similarity, idx in ranked
+            ] or self._fallback_criminal_context()
+            for ranked in self._rank_by_similarity(self._criminal_mat, query_embeddings, n_results, self._criminal_index)
+        ]
     
     def get_legal_context(self, query_text: str, n_results: int = 3) -> Dict[str, List[Dict[str, Any]]]:
         """Get relevant legal context from both Civil and Criminal Code."""
-        civil_results = self.search_civil_code(query_text, n_results)
-        criminal_results = self.search_criminal_code(query_text, max(1, n_results // 2))
+        # Encode the query once for both codes
+        query_embedding = self._create_query_embedding(query_text)
+        civil_results = self.search_civil_code(query_text, n_results, query_embedding)
+        criminal_results = self.search_criminal_code(query_text, max(1, n_results // 2), query_embedding)
         
         return {
             'civil_code': civil_results,
             'criminal_code': criminal_results
         }
     
-    def _fallback_civil_context(self) -> List[Dict[str, Any]]:
-        """Fallback Civil Code context when embeddings unavailable."""
+    def data_version(self) -> str:
+        """Version of the legal codes, changes whenever one of the source databases is rebuilt."""
+        mtimes = []
+        for path in (self.chroma_db_path, self.criminal_db_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(0)
+        return '-'.join(map(str, mtimes))
+    
+    def get_legal_context_batch(self, query_texts: List[str], n_results: int = 3) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """Get legal context for several queries, encoded in one model call and searched with one product per code."""
+        query_embeddings = self._create_query_embeddings(query_texts)
+        civil_results = self.search_civil_code_batch(query_embeddings, n_results)
+        criminal_results = self.search_criminal_code_batch(query_embeddings, max(1, n_results // 2))
+        
         return [
             {
-                'text': '§1815 Občanského zákoníku: Smlouva je neplatná, pokud odporuje zákonu nebo dobrým mravům.',
-                'metadata': {'paragraph': '1815'},
-                'similarity': 0.5
-            },
-            {
-                'text': '§1826 Občanského zákoníku: Podmínky smlouvy musí být spravedlivé pro obě strany.',
-                'metadata': {'paragraph': '1826'},
-                'similarity': 0.5
+                'civil_code': civil,
+                'criminal_code': criminal
             }
+            for civil, criminal in zip(civil_results, criminal_results)
         ]
     
+    def _fallback_civil_context(self) -> List[Dict[str, Any]]:
+        """Fallback Civil Code context when embeddings unavailable."""
+        return list(_FALLBACK_CIVIL_CONTEXT)
+    
     def _fallback_criminal_context(self) -> List[Dict[str, Any]]:
         """Fallback Criminal Code context when embeddings unavailable."""
-        return [
-            {
-                'paragraph_number': '1',
-                'text': '§1 Trestního zákoníku: Čin je trestný, jen pokud jeho trestnost byla zákonem stanovena dříve.',
-                'similarity': 0.5
-            }
-        ]
\ No newline at end of file
+        return list(_FALLBACK_CRIMINAL_CONTEXT)
\ No newline at end of file
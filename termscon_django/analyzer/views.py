@@ -1,14 +1,23 @@
 import sys
 import os
+import codecs
 import json
+import asyncio
+import logging
+import threading
+from collections import Counter
 from typing import List
+from django.conf import settings
 from django.shortcuts import render
+from django.urls import reverse
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.db import transaction
 import uuid
+import orjson
 
 # Add the project directory to the Python path
 sys.path.insert(0, '/home/runner/work/termscon/termscon')
@@ -16,25 +25,13 @@ sys.path.insert(0, '/home/runner/work/termscon/termscon')
 from .simple_schemas import AnalysisResult, OverallSummary, RiskLevel
 from .text_processing_simple import SimpleTextProcessor  
 from .vector_db_real import RealVectorDB
-from .models import AnalysisSession, ClauseAnalysisResult
+from .models import AnalysisSession, ClauseAnalysisResult, AnalysisJob, JobState
+from .jobs import submit_analysis, fail_stale_jobs
 
-# Try to use optimized GPT analyzer first
-try:
-    from .gpt_analyzer_optimized import OptimizedGPTAnalyzer
-    USE_OPTIMIZED_GPT = True
-except ImportError:
-    from .gpt_analyzer_real import RealGPTAnalyzer
-    USE_OPTIMIZED_GPT = False
+logger = logging.getLogger(__name__)
 
-
-class SimplifiedVectorDB:
-    def __init__(self, chroma_db_path: str, criminal_db_path: str):
-        # Use the real vector DB for actual embedding search
-        self.real_db = RealVectorDB(chroma_db_path, criminal_db_path)
-    
-    def get_legal_context(self, query_text: str, n_results: int = 3) -> dict:
-        """Get legal context using real embeddings."""
-        return self.real_db.get_legal_context(query_text, n_results)
+# Clauses whose legal context is searched and analyzed together, GPT calls of one batch overlap the search of the next
+CONTEXT_BATCH_SIZE = 8
 
 
 class TermsAnalyzer:
@@ -42,13 +39,26 @@ class TermsAnalyzer:
         chroma_db_path = "/home/runner/work/termscon/termscon/chroma.sqlite3"
         criminal_db_path = "/home/runner/work/termscon/termscon/trestni_zakonik.sqlite"
         
-        self.vector_db = SimplifiedVectorDB(chroma_db_path, criminal_db_path)
+        # Searched directly, the analyzer itself is built once per process by the app config
+        self.vector_db = RealVectorDB(chroma_db_path, criminal_db_path)
         self.text_processor = SimpleTextProcessor()
         
+        # One event loop for the life of the process, so the GPT analyzer's pooled connections outlive each document
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='analyzer-loop', daemon=True).start()
+        
+        # Try to use optimized GPT analyzer first, imported here so management commands skip the openai import
+        try:
+            from .gpt_analyzer_optimized import OptimizedGPTAnalyzer
+            use_optimized_gpt = True
+        except ImportError:
+            from .gpt_analyzer_real import RealGPTAnalyzer
+            use_optimized_gpt = False
+        
         # Try to use optimized GPT analyzer, fallback to regular, then mock
-        if USE_OPTIMIZED_GPT:
+        if use_optimized_gpt:
             try:
-                self.gpt_analyzer = OptimizedGPTAnalyzer()
+                self.gpt_analyzer = OptimizedGPTAnalyzer(legal_db_version=self.vector_db.data_version())
                 print("✅ Using optimized OpenAI GPT analyzer (cost-efficient)")
             except ValueError as e:
                 print(f"⚠️  OpenAI API not configured: {e}")
@@ -80,43 +90,29 @@ class TermsAnalyzer:
         if not clauses:
             raise ValueError("Could not segment document into clauses")
         
-        # Analyze each clause
-        clause_analyses = []
+        # Search legal context and analyze all clauses concurrently with GPT (optimized version)
+        logger.debug("Analyzing %d clauses", len(clauses))
+        clause_analyses, overview_text = asyncio.run_coroutine_threadsafe(self.analyze_document_async(clauses), self._loop).result()
         
-        for i, clause in enumerate(clauses):
-            print(f"Analyzing clause {i+1}/{len(clauses)}")
-            
-            # Get relevant legal context using semantic search on actual clause text
-            legal_context = self.vector_db.get_legal_context(clause, n_results=3)
-            
-            # Analyze with GPT (optimized version)
-            analysis = self.gpt_analyzer.analyze_clause(clause, legal_context, i + 1)
-            clause_analyses.append(analysis)
-        
-        # Calculate overall summary
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-        for analysis in clause_analyses:
-            risk_counts[analysis.risk_level.value] += 1
+        # Calculate overall summary, counted by enum member to skip the .value lookups
+        risk_counts = Counter(analysis.risk_level for analysis in clause_analyses)
         
         # Determine overall risk level
-        if risk_counts["Critical"] > 0:
+        if risk_counts[RiskLevel.CRITICAL] > 0:
             overall_risk = RiskLevel.CRITICAL
-        elif risk_counts["High"] > 0:
+        elif risk_counts[RiskLevel.HIGH] > 0:
             overall_risk = RiskLevel.HIGH
-        elif risk_counts["Medium"] > risk_counts["Low"]:
+        elif risk_counts[RiskLevel.MEDIUM] > risk_counts[RiskLevel.LOW]:
             overall_risk = RiskLevel.MEDIUM
         else:
             overall_risk = RiskLevel.LOW
         
-        # Generate overall summary text
-        overview_text = self.gpt_analyzer.generate_overall_summary(clause_analyses)
-        
         overall_summary = OverallSummary(
             overall_risk_score=overall_risk,
             total_clauses=len(clause_analyses),
-            high_risk_count=risk_counts["High"] + risk_counts["Critical"],
-            medium_risk_count=risk_counts["Medium"],
-            low_risk_count=risk_counts["Low"],
+            high_risk_count=risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL],
+            medium_risk_count=risk_counts[RiskLevel.MEDIUM],
+            low_risk_count=risk_counts[RiskLevel.LOW],
             overview=overview_text
         )
         
@@ -131,38 +127,75 @@ class TermsAnalyzer:
         
         return result
     
+    async def analyze_clauses_async(self, clauses: List[str]) -> List:
+        """Analyze all clauses concurrently, the GPT calls are bound by network round trips; known clauses come from the cache."""
+        async def analyze(clause, legal_context, clause_id):
+            if hasattr(self.gpt_analyzer, 'analyze_clause_async'):
+                return await self.gpt_analyzer.analyze_clause_async(clause, legal_context, clause_id)
+            return await asyncio.to_thread(self.gpt_analyzer.analyze_clause, clause, legal_context, clause_id)
+        
+        # Clauses seen in earlier documents, boilerplate above all, skip both the legal context search and GPT
+        if hasattr(self.gpt_analyzer, 'get_cached_analyses'):
+            analyses = self.gpt_analyzer.get_cached_analyses(clauses, list(range(1, len(clauses) + 1)))
+        else:
+            analyses = [None] * len(clauses)
+        pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+        
+        # Legal context is searched batch by batch on a worker thread, the GPT calls of each batch start right away
+        batches = []
+        tasks = []
+        for start in range(0, len(pending), CONTEXT_BATCH_SIZE):
+            indices = pending[start:start + CONTEXT_BATCH_SIZE]
+            batch = [clauses[i] for i in indices]
+            legal_contexts = await asyncio.to_thread(self.vector_db.get_legal_context_batch, batch, 3)
+            if hasattr(self.gpt_analyzer, 'analyze_clauses_batch_async'):
+                # One request covers the whole batch instead of one round trip per clause
+                batch_analyses = self.gpt_analyzer.analyze_clauses_batch_async(batch, legal_contexts, [i + 1 for i in indices])
+            else:
+                batch_analyses = asyncio.gather(*[
+                    analyze(clause, legal_context, i + 1)
+                    for i, clause, legal_context in zip(indices, batch, legal_contexts)
+                ])
+            tasks.append(asyncio.ensure_future(batch_analyses))
+            batches.append(indices)
+        
+        for indices, batch_analyses in zip(batches, await asyncio.gather(*tasks)):
+            for i, analysis in zip(indices, batch_analyses):
+                analyses[i] = analysis
+        return analyses
+    
+    async def analyze_document_async(self, clauses: List[str]):
+        """Analyze all clauses and write the overall summary text in one event loop."""
+        clause_analyses = await self.analyze_clauses_async(clauses)
+        
+        # The summary call reuses the connections the clause calls just warmed up
+        if hasattr(self.gpt_analyzer, 'generate_overall_summary_async'):
+            overview_text = await self.gpt_analyzer.generate_overall_summary_async(clause_analyses)
+        else:
+            # A blocking call here would stall every document sharing the loop
+            overview_text = await asyncio.to_thread(self.gpt_analyzer.generate_overall_summary, clause_analyses)
+        
+        return clause_analyses, overview_text
+    
     def _save_to_database(self, result: AnalysisResult, text_content: str, filename: str = None):
         """Save analysis result to database."""
         try:
-            session = AnalysisSession.objects.create(
-                id=result.document_id,
-                original_filename=filename or "pasted_text.txt",
-                document_text=text_content,
-                overall_risk_score=result.overall_summary.overall_risk_score.value,
-                total_clauses=result.overall_summary.total_clauses,
-                high_risk_count=result.overall_summary.high_risk_count,
-                medium_risk_count=result.overall_summary.medium_risk_count,
-                low_risk_count=result.overall_summary.low_risk_count,
-                overview=result.overall_summary.overview
-            )
-            
-            for clause_analysis in result.clause_analyses:
-                ClauseAnalysisResult.objects.create(
-                    session=session,
-                    clause_id=clause_analysis.clause_id,
-                    original_text=clause_analysis.original_text,
-                    risk_level=clause_analysis.risk_level.value,
-                    summary=clause_analysis.summary,
-                    legal_conflicts=clause_analysis.legal_conflicts,
-                    explanation=clause_analysis.explanation,
-                    relevant_laws=clause_analysis.relevant_laws
+            with transaction.atomic():
+                session = AnalysisSession.objects.create(
+                    id=result.document_id,
+                    original_filename=filename or "pasted_text.txt",
+                    document_text=text_content,
+                    overall_risk_score=result.overall_summary.overall_risk_score.value,
+                    total_clauses=result.overall_summary.total_clauses,
+                    high_risk_count=result.overall_summary.high_risk_count,
+                    medium_risk_count=result.overall_summary.medium_risk_count,
+                    low_risk_count=result.overall_summary.low_risk_count,
+                    overview=result.overall_summary.overview
                 )
+                
+                ClauseAnalysisResult.persist_many(session, result.clause_analyses)
         except Exception as e:
-            print(f"Error saving to database: {e}")
-
-
-# Initialize analyzer instance
-analyzer = TermsAnalyzer()
+            logger.error("Error saving to database: %s", e)
 
 
 def home(request):
@@ -184,10 +217,15 @@ def analyze_document(request):
             uploaded_file = request.FILES['file']
             filename = uploaded_file.name
             
-            if filename.lower().endswith('.txt'):
-                text_content = uploaded_file.read().decode('utf-8')
-            else:
+            if not filename.lower().endswith('.txt'):
                 return JsonResponse({'error': 'Only .txt files are supported in demo'}, status=400)
+            if uploaded_file.size > settings.MAX_UPLOAD_SIZE:
+                return JsonResponse({'error': 'File is too large'}, status=413)
+            
+            try:
+                text_content = _decode_upload(uploaded_file)
+            except UnicodeDecodeError:
+                return JsonResponse({'error': 'File is not valid UTF-8 text'}, status=400)
         
         # Check if it's text content
         elif 'text_content' in request.POST:
@@ -200,41 +238,57 @@ def analyze_document(request):
         if not text_content or not text_content.strip():
             return JsonResponse({'error': 'No text content found in the document'}, status=400)
         
-        # Analyze the document
-        result = analyzer.analyze_text(text_content, filename)
+        # Queue the analysis, the client polls the job instead of holding this worker
+        job = submit_analysis(text_content, filename)
         
-        # Convert to dict for JSON response
-        response_data = {
-            "document_id": result.document_id,
-            "overall_summary": {
-                "overall_risk_score": result.overall_summary.overall_risk_score.value,
-                "total_clauses": result.overall_summary.total_clauses,
-                "high_risk_count": result.overall_summary.high_risk_count,
-                "medium_risk_count": result.overall_summary.medium_risk_count,
-                "low_risk_count": result.overall_summary.low_risk_count,
-                "overview": result.overall_summary.overview
-            },
-            "clause_analyses": [
-                {
-                    "clause_id": clause.clause_id,
-                    "original_text": clause.original_text,
-                    "risk_level": clause.risk_level.value,
-                    "summary": clause.summary,
-                    "legal_conflicts": clause.legal_conflicts,
-                    "explanation": clause.explanation,
-                    "relevant_laws": clause.relevant_laws
-                }
-                for clause in result.clause_analyses
-            ]
-        }
-        
-        return JsonResponse(response_data)
+        return JsonResponse({
+            'job_id': str(job.id),
+            'state': job.state,
+            'status_url': reverse('termscon_django.analyzer:job', args=[job.id])
+        }, status=202)
         
     except Exception as e:
-        print(f"Analysis error: {str(e)}")
+        logger.error("Analysis error: %s", e)
         return JsonResponse({'error': f'Analysis failed: {str(e)}'}, status=500)
 
 
+class ORJSONResponse(HttpResponse):
+    """JSON response encoded by orjson, which writes the bytes directly."""
+    
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(orjson.dumps(data), **kwargs)
+
+
+def _decode_upload(uploaded_file) -> str:
+    """Decode an uploaded text file chunk by chunk, never holding its bytes and text at once."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = [decoder.decode(chunk) for chunk in uploaded_file.chunks()]
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+@require_http_methods(["GET"])
+def analysis_job_status(request, job_id):
+    """Report the state of an analysis job, with the result once done."""
+    # A job whose worker died while the server kept running is failed here rather than polled forever
+    fail_stale_jobs(job_id)
+    try:
+        job = AnalysisJob.objects.get(id=job_id)
+    except AnalysisJob.DoesNotExist:
+        return JsonResponse({'error': 'Analysis job not found'}, status=404)
+    
+    response_data = {'job_id': str(job.id), 'state': job.state}
+    if job.state == JobState.DONE:
+        # The stored result is already JSON, spliced in as the last member rather than decoded and encoded again
+        body = orjson.dumps(response_data)[:-1] + b',"result":' + job.result.encode('utf-8') + b'}'
+        return HttpResponse(body, content_type='application/json')
+    if job.state == JobState.FAILED:
+        response_data['error'] = f'Analysis failed: {job.error}'
+    
+    return ORJSONResponse(response_data)
+
+
 def health_check(request):
     """Health check endpoint."""
     return JsonResponse({"status": "healthy", "message": "Terms & Conditions Analyzer is running"})
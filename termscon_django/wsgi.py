@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.apps import apps
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'termscon_django.settings')
 
 application = get_wsgi_application()
+
+# Jobs queued or running when the previous server process stopped will never finish
+from termscon_django.analyzer.jobs import fail_stale_jobs_on_startup
+fail_stale_jobs_on_startup()
+
+# Load the analyzer in the background so the first request does not pay for it
+apps.get_app_config('analyzer').warm_up()